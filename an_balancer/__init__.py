@@ -0,0 +1,3 @@
+from .balancer import (FIELDS, TABLES_FILE, VERSION, Balancer, Creature, CreatureIndex, find_creatures,
+                       load_tables, replace_value, replace_value_min_max)
+from .document import Document, Node, parse, tokenize
@@ -0,0 +1,170 @@
+import copy
+import os
+import struct
+import zipfile
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+
+from .document import Document
+from .files import write_if_changed
+
+# Members of a mod archive holding creatures, matched ignoring case as VCMI does, at any depth of the archive
+# since mods may be packed with their own folder
+CREATURE_MEMBERS = '*config/creatures/*.json'
+
+# Bit of general purpose flags of a member whose sizes and CRC follow its data instead of its local header
+DATA_DESCRIPTOR = 0x08
+
+
+# Creature members of archive in order of the archive. Raises ValueError on a member that would be written
+# outside of the output directory, and when archive has no creature member
+def creature_members(archive):
+    members = []
+    for info in archive.infolist():
+        if info.is_dir() or not fnmatchcase(info.filename.lower(), CREATURE_MEMBERS):
+            continue
+
+        path = PurePosixPath(info.filename)
+        if path.is_absolute() or '..' in path.parts:
+            raise ValueError(f'unsafe member name {info.filename!r}')
+
+        members.append(info)
+
+    if not members:
+        raise ValueError('no creature file found, expected config/creatures/*.json')
+
+    return members
+
+
+# Texts of creature members of archive at archive_path in order of the archive, as list of (member name, text).
+# Raises ValueError naming a member that isn't UTF-8 text
+def creature_texts(archive_path):
+    texts = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in creature_members(archive):
+            try:
+                texts.append((info.filename, archive.read(info).decode('utf-8')))
+            except UnicodeDecodeError as e:
+                raise ValueError(f'{info.filename}: {type(e).__name__}: {e}') from e
+
+    return texts
+
+
+# Path naming member of archive at archive_path, like the directory it's balanced into,
+# e.g. mod.zip/config/creatures/imps.json
+def member_path(archive_path, name):
+    return (archive_path / name).as_posix()
+
+
+# Balances creature members of archive, returns {member name: (balanced text, number of changed fields)}
+# and list of (member name, error). A broken member doesn't stop balancing of others
+def balance_members(archive, members, balancer):
+    balanced = {}
+    errors = []
+    for info in members:
+        try:
+            document = Document(archive.read(info).decode('utf-8'))
+            balancer.correct_values(document)
+            balanced[info.filename] = (document.render(), len(document.edits))
+        except Exception as e:
+            errors.append((info.filename, f'{type(e).__name__}: {e}'))
+
+    return balanced, errors
+
+
+def raise_member_errors(errors):
+    if errors:
+        raise ValueError('; '.join(f'{name}: {error}' for name, error in errors))
+
+
+# Copies member from raw file of its archive into destination archive as its compressed bytes, without
+# decompressing and compressing it again. zipfile can't do this, so the local header and the entry of central
+# directory are written the way ZipFile.write does. Sizes and CRC are always written in the local header
+def copy_raw(raw, destination, info):
+    raw.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, raw.read(zipfile.sizeFileHeader))
+    raw.seek(header[10] + header[11], os.SEEK_CUR)
+    data = raw.read(info.compress_size)
+
+    copied = copy.copy(info)
+    copied.flag_bits &= ~DATA_DESCRIPTOR
+    copied.header_offset = destination.fp.tell()
+    destination.fp.write(copied.FileHeader())
+    destination.fp.write(data)
+    destination.filelist.append(copied)
+    destination.NameToInfo[copied.filename] = copied
+    destination.start_dir = destination.fp.tell()
+
+
+# Writes copy of archive at archive_path to temp_file, with changed members replaced by their balanced texts
+# compressed as they were
+def write_archive(archive_path, archive, balanced, temp_file):
+    with archive_path.open('rb') as raw, zipfile.ZipFile(temp_file, 'w') as destination:
+        destination.comment = archive.comment
+        for info in archive.infolist():
+            text, fields = balanced.get(info.filename, (None, 0))
+            if not fields:
+                copy_raw(raw, destination, info)
+                continue
+
+            member = zipfile.ZipInfo(info.filename, info.date_time)
+            member.compress_type = info.compress_type
+            member.comment = info.comment
+            member.create_system = info.create_system
+            member.external_attr = info.external_attr
+            destination.writestr(member, text.encode('utf-8'))
+
+
+# Renames temp_file over path unless path already holds the same bytes, returns True if path was written
+def replace_if_changed(temp_file, path):
+    try:
+        if path.stat().st_size == temp_file.stat().st_size and path.read_bytes() == temp_file.read_bytes():
+            temp_file.unlink()
+            return False
+    except FileNotFoundError:
+        pass
+
+    os.replace(temp_file, path)
+    return True
+
+
+# Balances creature members of archive at archive_path. Balanced members are written under directory
+# prefix/archive_path, or into a copy of the whole archive at prefix/archive_path when repack is True,
+# or over the archive itself when prefix is None. Files and archives already balanced aren't written.
+# Returns (number of changed fields, number of files written), raises ValueError naming members that failed
+def create_balanced_archive(prefix, archive_path, balancer, repack=False):
+    output = archive_path if prefix is None else Path(f'{prefix}/{archive_path}')
+    temp_file = None
+    written = 0
+    with zipfile.ZipFile(archive_path) as archive:
+        balanced, errors = balance_members(archive, creature_members(archive), balancer)
+        fields = sum(member_fields for _, member_fields in balanced.values())
+        if prefix is not None and not repack:
+            if output.is_file():
+                raise ValueError(f'{output} is a balanced archive, remove it to write balanced creature files there')
+
+            for name, (text, _) in balanced.items():
+                written += write_if_changed(output / name, text)
+        elif prefix is not None or fields:
+            if output.is_dir():
+                raise ValueError(f'{output} is a directory of balanced creature files, remove it to write an archive')
+
+            output.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = output.with_name(f'.{output.name}.tmp')
+            write_archive(archive_path, archive, balanced, temp_file)
+
+    # Archive is replaced once it's closed, as open files can't be replaced on Windows
+    if temp_file is not None:
+        written = int(replace_if_changed(temp_file, output))
+
+    raise_member_errors(errors)
+    return fields, written
+
+
+# Balanced texts of all creature members of archive at archive_path, one after another
+def balance_archive_text(archive_path, balancer):
+    with zipfile.ZipFile(archive_path) as archive:
+        balanced, errors = balance_members(archive, creature_members(archive), balancer)
+
+    raise_member_errors(errors)
+    return ''.join(text for text, _ in balanced.values())
@@ -0,0 +1,540 @@
+import json
+import math
+import os
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+from .document import Document
+
+VERSION = '1.1'
+
+FIELDS = (
+    'max',
+    'min',
+    'val',
+    'level',
+    'attack',
+    'defense',
+    'hitPoints',
+    'damage',
+    'speed',
+    'upgrades',
+    'advMapAmount',
+    'aiValue',
+    'fightValue'
+)
+
+# Data file of formulas, holding:
+# - std_defence and std_attack: defence and attack of each unupgraded and upgraded standard creature,
+#   for example first two values of std_defence are 5 of pikeman and 5 of halberdier
+# - dmg_factor, prot_power_fight (less for Fight value), prot_power_ai (more for AI value), mul_fight and mul_ai
+# - speed_bonus: pairs of speed and multiplier of fight and AI values of creatures faster than that speed
+# - abilities: rows of name of ability, bonus to fight value, bonus to ai value (percents),
+#   bonus to damage (percents) not used now and two reserved values
+# - level_ranges: ranges of attack, defence, max damage, hit points and lowest min damage of each level
+#   (min damage is also capped by max damage)
+# - quantity_ranges: ranges of quantity on adventure map of upgraded and unupgraded creatures of each level
+TABLES_FILE = Path(__file__).with_name('tables.json')
+
+
+def load_tables(path=TABLES_FILE):
+    with Path(path).open(encoding='utf-8') as f:
+        return json.load(f)
+
+
+# numpy speeds up scoring many creatures at once. It's optional and imported on first use,
+# so neither scoring one creature nor a missing numpy pays for the import more than once
+@lru_cache(maxsize=None)
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def calc_damage_coeff(attack, defence):
+    avg_skill = 4
+    a = attack + avg_skill
+    d = defence + avg_skill
+    if a >= d:
+        return round(1 + min((a - d) * 0.05, 3))
+    else:
+        return round(1 - min((d - a) * 0.025, 0.7))
+
+
+def calc_final(att_v, def_v, prot_power, mul):
+    if att_v == 0:
+        return 0
+    else:
+        return round(math.sqrt(att_v) * pow(def_v, prot_power) * mul)
+
+
+# Applies calc_att_damage or calc_def_damage to columns of skills and reductions,
+# through a table holding each distinct skill against each distinct reduction
+def calc_damage_array(numpy, calc_damage, skill, reduction):
+    skills, skill_index = numpy.unique(skill, return_inverse=True)
+    reductions, reduction_index = numpy.unique(reduction, return_inverse=True)
+    table = numpy.array([[calc_damage(s, r) for r in reductions.tolist()] for s in skills.tolist()], ndmin=2)
+    return table[skill_index.reshape(-1), reduction_index.reshape(-1)]
+
+
+def calc_final_array(numpy, att_v, def_v, prot_power, mul):
+    final = numpy.round(numpy.sqrt(att_v) * numpy.power(def_v, prot_power) * mul)
+    return numpy.where(att_v == 0, 0, final).astype(numpy.int64)
+
+
+# Min and max damage of a creature as scored, with abilities (dict of "val" by type) changing its damage
+def scored_damage(abilities, min_damage, max_damage):
+    corr_max_damage = max_damage
+    corr_min_damage = min_damage
+    if 'ALWAYS_MINIMUM_DAMAGE' in abilities:
+        corr_max_damage = min_damage
+    if 'ALWAYS_MAXIMUM_DAMAGE' in abilities:
+        corr_min_damage = max_damage
+    if 'THREE_HEADED_ATTACK' in abilities:
+        corr_max_damage *= 3
+    if 'ATTACKS_ALL_ADJACENT' in abilities:
+        corr_max_damage *= 6
+    if 'ADDITIONAL_ATTACK' in abilities:
+        corr_max_damage *= 2
+    if 'TWO_HEX_ATTACK_BREATH' in abilities:
+        corr_max_damage *= 2
+    if 'WIDE_BREATH' in abilities:
+        corr_max_damage *= 2
+    if 'ACID_BREATH' in abilities:
+        corr_max_damage += abilities['ACID_BREATH']
+    if 'POISON' in abilities:
+        corr_max_damage += abilities['POISON']
+    if 'DOUBLE_DAMAGE_CHANCE' in abilities:
+        double_damage_chance = abilities['DOUBLE_DAMAGE_CHANCE']
+        if double_damage_chance > 0:
+            corr_max_damage += max_damage
+
+    return corr_min_damage, corr_max_damage
+
+
+# General attack reduction and enemy defence reduction given by abilities, as fractions up to 1
+def ability_reductions(abilities):
+    enemy_defence_reduction = 0
+    general_attack_reduction = 0
+    if 'ENEMY_DEFENCE_REDUCTION' in abilities:
+        enemy_defence_reduction = abilities['ENEMY_DEFENCE_REDUCTION'] / 100
+        if enemy_defence_reduction >= 1:
+            enemy_defence_reduction = 1
+
+    if 'PERCENTAGE_DAMAGE_BOOST' in abilities:
+        enemy_defence_reduction = abilities['PERCENTAGE_DAMAGE_BOOST'] / 100
+        if enemy_defence_reduction >= 1:
+            enemy_defence_reduction = 1
+
+    if 'GENERAL_ATTACK_REDUCTION' in abilities:
+        general_attack_reduction = abilities['GENERAL_ATTACK_REDUCTION'] / 100
+        if general_attack_reduction >= 1:
+            general_attack_reduction = 1
+
+    return general_attack_reduction, enemy_defence_reduction
+
+
+def correct_value_within_range(value, minimum, maximum):
+    if value > maximum:
+        return maximum
+    elif value < minimum:
+        return minimum
+    else:
+        return value
+
+
+# Index of a creature object: its numeric stats and the "val" of each of its abilities by type
+class CreatureIndex:
+    STATS = (FIELDS[3], FIELDS[4], FIELDS[5], FIELDS[6], FIELDS[8])
+
+    def __init__(self, node):
+        self.node = node
+        self.abilities = {}
+        abilities = node.get('abilities')
+        items = ()
+        if abilities is not None and abilities.kind == 'object':
+            items = abilities.value.values()
+        elif abilities is not None and abilities.kind == 'array':
+            items = abilities.value
+
+        for item in items:
+            ability_type = item.get('type', 'string')
+            if ability_type is not None:
+                val = item.get(FIELDS[2], 'number')
+                self.abilities.setdefault(ability_type.value, 0 if val is None else val.value)
+
+    def is_creature(self):
+        return all(self.node.get(name, 'number') is not None for name in self.STATS)
+
+    # Returns True if creature has ability of given type
+    def has(self, ability_type):
+        return ability_type in self.abilities
+
+    def stat(self, name):
+        return self.node.get(name, 'number').value
+
+    # Value of ability of given type, -1 if creature doesn't have it
+    def ability_value(self, ability_type):
+        return self.abilities.get(ability_type, -1)
+
+    # Returns "min" and "max" of given object field, -1 for each one that is missing
+    def min_max(self, name):
+        field = self.node.get(name)
+        minimum = field.get(FIELDS[1], 'number') if field is not None else None
+        maximum = field.get(FIELDS[0], 'number') if field is not None else None
+        return -1 if minimum is None else minimum.value, -1 if maximum is None else maximum.value
+
+
+# Record of a creature read from its object: level, stats, "val" of each of its abilities by type, bitmask of
+# abilities of the balancer's table it has, and offsets of its object in source text. Stats are corrected in place
+# by balancing. Slots keep records small, so a whole collection of mods can be held in memory at once
+class Creature:
+    __slots__ = ('level', 'attack', 'defence', 'hit_points', 'max_damage', 'min_damage', 'speed', 'abilities',
+                 'ability_mask', 'start', 'end')
+
+    def __init__(self, level, attack, defence, hit_points, max_damage, min_damage, speed, abilities=None,
+                 ability_mask=0, start=-1, end=-1):
+        self.level = level
+        self.attack = attack
+        self.defence = defence
+        self.hit_points = hit_points
+        self.max_damage = max_damage
+        self.min_damage = min_damage
+        self.speed = speed
+        self.abilities = {} if abilities is None else abilities
+        self.ability_mask = ability_mask
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return 'Creature(' + ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__) + ')'
+
+
+# Objects of a document that are creatures: the top-level object itself or its members
+def find_creatures(document):
+    root = document.root
+    if root.kind != 'object':
+        return []
+
+    creatures = [CreatureIndex(root)]
+    if not creatures[0].is_creature():
+        creatures = [CreatureIndex(node) for node in root.value.values() if node.kind == 'object']
+
+    return [index for index in creatures if index.is_creature()]
+
+
+# Replaces number of given field, if creature has it
+def replace_value(document, index, name, write_value):
+    node = index.node.get(name, 'number')
+    if node is not None:
+        document.replace(node, write_value)
+
+
+# Replaces two values "max" and "min" within specified object field
+def replace_value_min_max(document, index, name, write_min, write_max):
+    field = index.node.get(name)
+    if field is None:
+        return
+
+    for key, write_value in ((FIELDS[1], write_min), (FIELDS[0], write_max)):
+        node = field.get(key, 'number')
+        if node is not None:
+            document.replace(node, write_value)
+
+
+# Default number of scores kept by ScoreCache
+SCORE_CACHE_SIZE = 65536
+
+
+# Least recently used results of calculate_values keyed by its arguments, with counts of hits and misses.
+# Scores added since last drain are also kept aside, so pool workers can send them back to be saved
+class ScoreCache:
+    def __init__(self, maxsize=SCORE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.scores = OrderedDict()
+        self.new = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.scores.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.scores.move_to_end(key)
+
+        return value
+
+    def put(self, key, value, new=True):
+        if self.maxsize <= 0:
+            return
+
+        self.scores[key] = value
+        self.scores.move_to_end(key)
+        if len(self.scores) > self.maxsize:
+            self.scores.popitem(last=False)
+
+        if new and len(self.new) < self.maxsize:
+            self.new[key] = value
+
+    # Returns (hits, misses, list of new scores) since last drain and starts counting again
+    def drain(self):
+        result = (self.hits, self.misses, list(self.new.items()))
+        self.hits = self.misses = 0
+        self.new = {}
+        return result
+
+    # Adds what another cache returned from drain
+    def merge(self, hits, misses, scores):
+        self.hits += hits
+        self.misses += misses
+        for key, value in scores:
+            self.put(tuple(key), tuple(value), False)
+
+    # Loads scores saved with the same formula hash, a missing or outdated file leaves cache as it is
+    def load(self, path, formula):
+        try:
+            with Path(path).open() as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if data.get('formula') == formula:
+            for score in data.get('scores', []):
+                self.put(tuple(score[:-2]), tuple(score[-2:]), False)
+
+    def save(self, path, formula):
+        cache_file = Path(path)
+        temp_file = Path(f'{cache_file}.tmp')
+        with temp_file.open('w') as f:
+            json.dump({'formula': formula, 'scores': [list(key + value) for key, value in self.scores.items()]}, f)
+
+        os.replace(temp_file, cache_file)
+
+
+# Scores and balances creatures with formulas of given tables, by default those of tables.json.
+# Tables are loaded and prepared once, and damage against standard creatures is memoized,
+# so one balancer should be kept to score many creatures. Scores are kept in a cache of cache_size entries
+class Balancer:
+    def __init__(self, tables=None, cache_size=SCORE_CACHE_SIZE):
+        if tables is None:
+            tables = load_tables()
+
+        self.tables = tables
+        self.std_defence = tuple(tables['std_defence'])
+        self.std_attack = tuple(tables['std_attack'])
+
+        # Standard skills grouped as (skill, number of creatures having it), so each distinct skill is scored once
+        self.std_defence_counts = tuple(sorted(Counter(self.std_defence).items()))
+        self.std_attack_counts = tuple(sorted(Counter(self.std_attack).items()))
+
+        self.dmg_factor = tables['dmg_factor']
+        self.prot_power_fight = tables['prot_power_fight']
+        self.prot_power_ai = tables['prot_power_ai']
+        self.mul_fight = tables['mul_fight']
+        self.mul_ai = tables['mul_ai']
+        self.abilities = tuple(tuple(ability) for ability in tables['abilities'])
+
+        # Bits of each ability of the table by its name, built once so a creature's mask takes one lookup per ability
+        self.ability_bits = {}
+        for bit, ability in enumerate(self.abilities):
+            self.ability_bits[ability[0]] = self.ability_bits.get(ability[0], 0) | 1 << bit
+
+        # Multiplier of values of creatures faster than given speed, highest speed first
+        self.speed_bonus = tuple(sorted((tuple(bonus) for bonus in tables['speed_bonus']), reverse=True))
+
+        # Ranges of each level: attack, defence, max damage, lowest min damage, hit points
+        self.level_ranges = {}
+        for level, ranges in tables['level_ranges'].items():
+            self.level_ranges[int(level)] = (tuple(ranges['attack']), tuple(ranges['defence']),
+                                             tuple(ranges['max_damage']), ranges['min_damage_lowest'],
+                                             tuple(ranges['hit_points']))
+
+        # Ranges of quantity of each level: upgraded, unupgraded
+        self.quantity_ranges = {}
+        for level, ranges in tables['quantity_ranges'].items():
+            self.quantity_ranges[int(level)] = (tuple(ranges['upgraded']), tuple(ranges['unupgraded']))
+
+        # Results of calc_att_damage and calc_def_damage, keyed by (skill, reduction) and filled on first use
+        self.att_damage_table = {}
+        self.def_damage_table = {}
+        self.score_cache = ScoreCache(cache_size)
+
+    # Hash of balancer version and all tables and constants balanced values depend on
+    def formula_hash(self):
+        import hashlib
+
+        tables = [VERSION, self.tables]
+        return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()
+
+    def calc_att_damage(self, attack, enemy_defence_reduction):
+        key = (attack, enemy_defence_reduction)
+        result = self.att_damage_table.get(key)
+        if result is None:
+            result = 0
+            for defence, count in self.std_defence_counts:
+                result += count * calc_damage_coeff(attack, defence * (1 - enemy_defence_reduction))
+
+            result = self.att_damage_table[key] = round(result / len(self.std_defence))
+
+        return result
+
+    def calc_def_damage(self, defence, general_attack_reduction):
+        key = (defence, general_attack_reduction)
+        result = self.def_damage_table.get(key)
+        if result is None:
+            result = 0
+            for attack, count in self.std_attack_counts:
+                result += count * calc_damage_coeff(attack * (1 - general_attack_reduction), defence)
+
+            result = self.def_damage_table[key] = round(result / len(self.std_attack))
+
+        return result
+
+    def calculate_values(self, attack, defence, hit_points, min_damage, max_damage,
+                         general_attack_reduction, enemy_defence_reduction):
+        key = (attack, defence, hit_points, min_damage, max_damage, general_attack_reduction, enemy_defence_reduction)
+        result = self.score_cache.get(key)
+        if result is not None:
+            return result
+
+        att_v = self.calc_att_damage(attack, enemy_defence_reduction) * (
+            self.dmg_factor * max_damage + (1 - self.dmg_factor) * min_damage) * 50 + 1
+
+        def_v = (7 / self.calc_def_damage(defence, general_attack_reduction) + 1) * hit_points + 1
+
+        final_v = calc_final(att_v, def_v, self.prot_power_fight, self.mul_fight)
+        final_ai = calc_final(att_v, def_v, self.prot_power_ai, self.mul_ai)
+        self.score_cache.put(key, (final_v, final_ai))
+        return final_v, final_ai
+
+    # Scores many creatures at once, each argument is a column with one value per creature.
+    # Returns (fight values, AI values), as numpy arrays if numpy is installed, lists otherwise
+    def calculate_values_batch(self, attack, defence, hit_points, min_damage, max_damage,
+                               general_attack_reduction, enemy_defence_reduction):
+        numpy = import_numpy()
+        if numpy is None:
+            values = [self.calculate_values(*creature) for creature in zip(
+                attack, defence, hit_points, min_damage, max_damage, general_attack_reduction,
+                enemy_defence_reduction)]
+            return [value[0] for value in values], [value[1] for value in values]
+
+        attack = numpy.asarray(attack)
+        defence = numpy.asarray(defence)
+        hit_points = numpy.asarray(hit_points)
+        min_damage = numpy.asarray(min_damage)
+        max_damage = numpy.asarray(max_damage)
+        general_attack_reduction = numpy.asarray(general_attack_reduction, dtype=float)
+        enemy_defence_reduction = numpy.asarray(enemy_defence_reduction, dtype=float)
+
+        att_damage = calc_damage_array(numpy, self.calc_att_damage, attack, enemy_defence_reduction)
+        def_damage = calc_damage_array(numpy, self.calc_def_damage, defence, general_attack_reduction)
+        att_v = att_damage * (self.dmg_factor * max_damage + (1 - self.dmg_factor) * min_damage) * 50 + 1
+        with numpy.errstate(divide='raise'):
+            def_v = (7 / def_damage + 1) * hit_points + 1
+
+        final_v = calc_final_array(numpy, att_v, def_v, self.prot_power_fight, self.mul_fight)
+        final_ai = calc_final_array(numpy, att_v, def_v, self.prot_power_ai, self.mul_ai)
+        return final_v, final_ai
+
+    # Bitmask of abilities of the table, by their position in it, that abilities (dict of "val" by type) include
+    def ability_mask(self, abilities):
+        mask = 0
+        for ability_type in abilities:
+            mask |= self.ability_bits.get(ability_type, 0)
+
+        return mask
+
+    # Reads record of creature described by index
+    def read_creature(self, index):
+        min_damage, max_damage = index.min_max(FIELDS[7])
+        return Creature(index.stat(FIELDS[3]), index.stat(FIELDS[4]), index.stat(FIELDS[5]), index.stat(FIELDS[6]),
+                        max_damage, min_damage, index.stat(FIELDS[8]), index.abilities,
+                        self.ability_mask(index.abilities), index.node.start, index.node.end)
+
+    # Corrects stats of creature within ranges of its level and writes them to document,
+    # creatures of levels without ranges are left as they are
+    def balance_procedure(self, document, index, creature):
+        if creature.level not in self.level_ranges:
+            return
+
+        attack_range, defence_range, max_damage_range, min_damage_lowest, hit_points_range = \
+            self.level_ranges[creature.level]
+        creature.attack = correct_value_within_range(creature.attack, *attack_range)
+        creature.defence = correct_value_within_range(creature.defence, *defence_range)
+        creature.hit_points = correct_value_within_range(creature.hit_points, *hit_points_range)
+        creature.max_damage = correct_value_within_range(creature.max_damage, *max_damage_range)
+        creature.min_damage = correct_value_within_range(creature.min_damage, min_damage_lowest, creature.max_damage)
+
+        replace_value(document, index, FIELDS[4], creature.attack)
+        replace_value(document, index, FIELDS[5], creature.defence)
+        replace_value(document, index, FIELDS[6], creature.hit_points)
+        replace_value_min_max(document, index, FIELDS[7], creature.min_damage, creature.max_damage)
+
+    def rebalance_quantity(self, document, index, level):
+        is_upgraded = index.node.get(FIELDS[9]) is None
+        min_quantity = max_quantity = 0
+        if level in self.quantity_ranges:
+            min_quantity, max_quantity = self.quantity_ranges[level][0 if is_upgraded else 1]
+
+        replace_value_min_max(document, index, FIELDS[10], min_quantity, max_quantity)
+
+    # Balances creature described by index, returns its record with corrected stats
+    def correct_creature(self, document, index):
+        creature = self.read_creature(index)
+        self.balance_procedure(document, index, creature)
+        fight_value, ai_value = self.creature_values(creature)
+        replace_value(document, index, FIELDS[11], round(ai_value))
+        replace_value(document, index, FIELDS[12], round(fight_value))
+        self.rebalance_quantity(document, index, creature.level)
+        return creature
+
+    # Fight and AI values, not rounded, of a creature whose stats are already corrected within ranges of its level
+    def creature_values(self, creature):
+        corr_min_damage, corr_max_damage = scored_damage(creature.abilities, creature.min_damage, creature.max_damage)
+        general_attack_reduction, enemy_defence_reduction = ability_reductions(creature.abilities)
+        out = self.calculate_values(creature.attack, creature.defence, creature.hit_points, corr_min_damage,
+                                    corr_max_damage, general_attack_reduction, enemy_defence_reduction)
+        fight_value = out[0]
+        ai_value = out[1]
+
+        corr_fight_value = fight_value
+        corr_ai_value = ai_value
+
+        # Only set bits are visited, lowest first so bonuses are applied in order of the table
+        mask = creature.ability_mask
+        while mask:
+            bit = mask & -mask
+            ability = self.abilities[bit.bit_length() - 1]
+            corr_fight_value = corr_fight_value * ((100 + ability[1]) / 100)
+            corr_ai_value = corr_ai_value * ((100 + ability[2]) / 100)
+            mask ^= bit
+
+        for lowest_speed, multiplier in self.speed_bonus:
+            if creature.speed > lowest_speed:
+                corr_fight_value *= multiplier
+                corr_ai_value *= multiplier
+                break
+
+        return corr_fight_value, corr_ai_value
+
+    # Main procedure balancing documents, each creature of the document is balanced on its own.
+    # Objects lacking any of level, attack, defense, hitPoints and speed aren't creatures and are left untouched
+    def correct_values(self, document):
+        creatures = find_creatures(document)
+        if not creatures:
+            raise ValueError('no creature found')
+
+        for index in creatures:
+            self.correct_creature(document, index)
+
+        return document
+
+    # Returns balanced text of a creature file
+    def balance_text(self, text):
+        return self.correct_values(Document(text)).render()
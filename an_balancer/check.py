@@ -0,0 +1,120 @@
+import csv
+from pathlib import PurePosixPath
+
+from .balancer import FIELDS, find_creatures
+from .document import Document
+from .files import default_balancer, is_archive, read_text, run_tasks
+
+# Columns of divergences written by --check
+COLUMNS = ('file', 'line', 'creature', 'field', 'current', 'expected')
+
+
+# Fields of creature that balancing may change, as (name, node), fields of damage and advMapAmount are named
+# like damage.min
+def creature_fields(index):
+    for name in (FIELDS[4], FIELDS[5], FIELDS[6], FIELDS[7], FIELDS[11], FIELDS[12], FIELDS[10]):
+        if name not in (FIELDS[7], FIELDS[10]):
+            node = index.node.get(name, 'number')
+            if node is not None:
+                yield name, node
+
+            continue
+
+        field = index.node.get(name)
+        for key in (FIELDS[1], FIELDS[0]):
+            node = field.get(key, 'number') if field is not None else None
+            if node is not None:
+                yield f'{name}.{key}', node
+
+
+# Balances creatures of document in memory and compares each field with its text, nothing is rendered.
+# Returns list of (line, creature, field, current text, expected text). When fail_fast is True, only fields
+# of the first creature that differs are returned. A file holding one creature names it by name
+def check_document(document, balancer, name, fail_fast=False):
+    indexes = find_creatures(document)
+    if not indexes:
+        raise ValueError('no creature found')
+
+    names = {id(node): key for key, node in document.root.value.items()}
+    divergences = []
+    for index in indexes:
+        balancer.correct_creature(document, index)
+        for field, node in creature_fields(index):
+            if node.start in document.edits:
+                divergences.append((document.text.count('\n', 0, node.start) + 1, names.get(id(index.node), name),
+                                    field, document.text[node.start:node.end], document.edits[node.start][1]))
+
+        if fail_fast and divergences:
+            break
+
+    return divergences
+
+
+# Checks creature members of archive at archive_path, returns list of (member path, divergences of member)
+# named like the directory they are balanced into, e.g. mod.zip/config/creatures/imps.json
+def check_archive(archive_path, balancer, fail_fast=False):
+    from .archives import creature_texts, member_path
+
+    results = []
+    for name, text in creature_texts(archive_path):
+        try:
+            divergences = check_document(Document(text), balancer, PurePosixPath(name).stem, fail_fast)
+        except Exception as e:
+            raise ValueError(f'{name}: {type(e).__name__}: {e}') from e
+
+        results.append((member_path(archive_path, name), divergences))
+        if fail_fast and divergences:
+            break
+
+    return results
+
+
+# Checks one file, returns (list of (file, divergences), error, drained score cache),
+# the error is returned instead of raised so one broken file doesn't stop the check
+def check_file(file_name, fail_fast=False, cache_file=None):
+    balancer = default_balancer(cache_file)
+    try:
+        if is_archive(file_name):
+            results = check_archive(file_name, balancer, fail_fast)
+        else:
+            document = Document(read_text(file_name))
+            results = [(file_name.as_posix(), check_document(document, balancer, file_name.stem, fail_fast))]
+
+        return results, None, balancer.score_cache.drain()
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}', balancer.score_cache.drain()
+
+
+# Checks given files using up to jobs processes, writing divergent fields to output as CSV of COLUMNS.
+# With fail_fast, stops at the first file that differs. Scores computed by workers are merged into
+# score cache of this process' balancer. Returns list of (file, error), counts of files checked and of
+# divergent fields, and list of files that differ
+def check_files(files, jobs, output, fail_fast=False, cache_file=None):
+    score_cache = default_balancer(cache_file).score_cache
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    errors = []
+    divergent = []
+    total = fields = 0
+    tasks = ((file, fail_fast, cache_file) for file in files)
+    for (file, _, _), (results, error, cache) in run_tasks(check_file, tasks, jobs):
+        score_cache.merge(*cache)
+        total += 1
+        if error is not None:
+            errors.append((file, error))
+            if fail_fast:
+                break
+
+            continue
+
+        for path, divergences in results:
+            writer.writerows((path,) + divergence for divergence in divergences)
+            fields += len(divergences)
+
+        if any(divergences for _, divergences in results):
+            divergent.append(file)
+            if fail_fast:
+                break
+
+    output.flush()
+    return errors, total, fields, divergent
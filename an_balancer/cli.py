@@ -0,0 +1,389 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from .balancer import VERSION
+from .files import (balance_files, collect_files, default_balancer, load_manifest, run_tasks, save_manifest,
+                    try_balance_text)
+
+PREFIX = 'balanced'
+
+# Files balanced when walking directories without --include: creature files, and zipped mods
+DEFAULT_INCLUDE = ['*.json', '*.zip']
+
+
+def print_cache_statistics(score_cache, file):
+    print(f'Score cache: {score_cache.hits} hits, {score_cache.misses} misses, {len(score_cache.scores)} scores kept.',
+          file=file)
+
+
+# Saves score cache of balancer to cache_file, and prints its statistics
+def save_cache(balancer, cache_file, log):
+    balancer.score_cache.save(cache_file, balancer.formula_hash())
+    print_cache_statistics(balancer.score_cache, log)
+
+
+# Writes balanced text to standard output as UTF-8, keeping its line endings as they are
+def write_stdout(text):
+    try:
+        sys.stdout.buffer.write(text.encode('utf-8'))
+        sys.stdout.buffer.flush()
+    except BrokenPipeError:
+        # Reader of the pipe is gone, like head after enough lines, so stop without writing more
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+# Balances standard input to standard output, returns error or None
+def balance_stdin():
+    try:
+        text = sys.stdin.buffer.read().decode('utf-8')
+        write_stdout(default_balancer().balance_text(text))
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+
+    return None
+
+
+# Balances files to standard output one after another, returns list of (file, error) and number of files
+def balance_to_stdout(files, jobs, cache_file):
+    score_cache = default_balancer(cache_file).score_cache
+    errors = []
+    total = 0
+    tasks = ((file, cache_file) for file in files)
+    for (file, _), (text, error, cache) in run_tasks(try_balance_text, tasks, jobs):
+        score_cache.merge(*cache)
+        total += 1
+        if error is None:
+            write_stdout(text)
+        else:
+            errors.append((file, error))
+
+    return errors, total
+
+
+# Runs --sweep, writing CSV to standard output and messages to standard error
+def run_sweep(parser, args, files, balancer):
+    from .sweep import make_sets, parse_parameter, sweep
+
+    try:
+        parameters = [parse_parameter(text) for text in args.sweep]
+        make_sets(balancer.tables, [(name, values[:1]) for name, values in parameters])
+    except ValueError as e:
+        parser.error(f'argument --sweep: {e}')
+
+    errors, creatures, sets = sweep(files, parameters, args.jobs, sys.stdout, balancer)
+    for file, error in errors:
+        print(f'Error: {file}: {error}', file=sys.stderr)
+
+    print(f'Scored {creatures} creatures with {sets} sets of constants.', file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+# Runs --solve, writing CSV of best candidates to standard output and messages to standard error
+def run_solve(parser, args):
+    from .solver import parse_constraints, solve, write_candidates
+
+    try:
+        level, kind, target, fixed, abilities = parse_constraints(args.solve)
+        candidates, scored = solve(default_balancer(), level, kind, target, fixed, abilities, args.solutions)
+    except ValueError as e:
+        parser.error(f'argument --solve: {e}')
+
+    write_candidates(candidates, sys.stdout)
+    print(f'Found {len(candidates)} candidates, scored {scored} creatures.', file=sys.stderr)
+
+
+# Runs --check, writing CSV of divergent fields to standard output, exits with 1 if any file differs or fails
+def run_check(args, files, balancer, log):
+    from .check import check_files
+
+    try:
+        errors, total, fields, divergent = check_files(files, args.jobs, sys.stdout, args.fail_fast, args.cache)
+    except BrokenPipeError:
+        # Reader of the pipe is gone, like head after enough lines, the check failed anyway
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+    for file, error in errors:
+        print(f'Error: {file}: {error}', file=log)
+
+    print(f'Checked {total} files, found {fields} divergent fields in {len(divergent)} files.', file=log)
+    if args.cache:
+        save_cache(balancer, args.cache, log)
+
+    if errors or divergent:
+        sys.exit(1)
+
+    print('Done.', file=log)
+
+
+# Runs --index, updating the index with files of paths if any, then --query writing CSV to standard output
+def run_index(args, paths, files, balancer, log):
+    import sqlite3
+
+    from .corpus import open_index, query_index, update_index
+
+    errors = []
+    connection = open_index(args.index)
+    try:
+        if paths:
+            errors, total, skipped, removed = update_index(connection, paths, files, args.jobs, args.cache)
+            print(f'Indexed {total - skipped - len(errors)} files, skipped {skipped} unchanged files, '
+                  f'removed {removed} files.', file=log)
+
+        if args.query:
+            try:
+                count = query_index(connection, args.query, sys.stdout)
+                print(f'Query returned {count} rows.', file=log)
+            except sqlite3.Error as e:
+                errors.append(('query', f'{type(e).__name__}: {e}'))
+    finally:
+        connection.close()
+
+    for file, error in errors:
+        print(f'Error: {file}: {error}', file=log)
+
+    if args.cache:
+        save_cache(balancer, args.cache, log)
+
+    if errors:
+        sys.exit(1)
+
+    print('Done.', file=log)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="An's Balancer calculates AI and Fight Values of creatures in VCMI.\n"
+                    'Based on GrayFace and Macron1 formulas (http://wforum.heroes35.net/)',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        'paths',
+        help='path to json file of creature need to calculate AI/Fight Value, or to zip archive of a mod to balance '
+             'its config/creatures/*.json, - to balance standard input to standard output',
+        nargs='*',
+        metavar='path')
+    parser.add_argument(
+        '-j', '--jobs',
+        help='number of files balanced in parallel, 0 to use all CPUs (default: 1)',
+        type=int,
+        default=1,
+        metavar='N')
+    parser.add_argument(
+        '-f', '--force',
+        help='balance all files, even those unchanged since last run',
+        action='store_true')
+    parser.add_argument(
+        '-i', '--include',
+        help='when walking directories, balance only files matching this glob, may be repeated '
+             '(default: *.json and *.zip)',
+        action='append',
+        metavar='GLOB')
+    parser.add_argument(
+        '-e', '--exclude',
+        help='skip files and directories matching this glob, may be repeated',
+        action='append',
+        default=[],
+        metavar='GLOB')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        '--stdout',
+        help='write balanced files to standard output instead of balanced directory',
+        action='store_true')
+    output.add_argument(
+        '--inplace',
+        help='replace input files with balanced files instead of writing them to balanced directory',
+        action='store_true')
+    output.add_argument(
+        '--check',
+        help='write nothing, only check that files are balanced: write CSV of fields differing from their balanced '
+             'values to standard output, and exit with 1 if any differ',
+        action='store_true')
+    parser.add_argument(
+        '--fail-fast',
+        help='with --check, stop at the first file that differs, reporting only its first differing creature',
+        action='store_true')
+    parser.add_argument(
+        '--repack',
+        help='balance zip archives of mods into new archives in balanced directory, instead of directories of '
+             'their balanced creature files',
+        action='store_true')
+    parser.add_argument(
+        '-w', '--watch',
+        help='after balancing, keep running and balance files again as they are saved',
+        action='store_true')
+    parser.add_argument(
+        '--poll',
+        help='with --watch, detect changes by scanning files instead of inotify',
+        action='store_true')
+    parser.add_argument(
+        '--cache',
+        help='keep scores of creatures in this file between runs, and print hits and misses of the score cache',
+        metavar='FILE')
+    parser.add_argument(
+        '--sweep',
+        help='instead of balancing, write CSV of fight and AI values of creatures for each combination of values of '
+             'formula constants to standard output. NAME is a constant like mul_ai, fight.ABILITY or ai.ABILITY for '
+             'bonus of an ability, or speed.N for multiplier of creatures faster than N, may be repeated',
+        action='append',
+        metavar='NAME=VALUE[,VALUE...]')
+    parser.add_argument(
+        '--solve',
+        help='instead of balancing, write CSV of stats of a creature whose fight or AI value is closest to a target '
+             'to standard output, within ranges of its level. NAME is level, fight or ai for the target, a stat '
+             '(attack, defence, hit_points, min_damage, max_damage, speed) to fix it, or ability.TYPE for an ability '
+             'the creature has, with its val. Level and target are required, may be repeated',
+        action='append',
+        metavar='NAME[=VALUE]')
+    parser.add_argument(
+        '--solutions',
+        help='with --solve, number of best candidates written (default: 10)',
+        type=int,
+        default=10,
+        metavar='N')
+    parser.add_argument(
+        '--index',
+        help='instead of balancing, record creatures of given files in this SQLite database with their stats, '
+             'abilities and balanced values, files unchanged since last time are skipped',
+        metavar='FILE')
+    parser.add_argument(
+        '--query',
+        help='with --index, run SQL query on the database and write its results as CSV to standard output, '
+             'after recording given files if any. Tables are creatures, abilities, level_ranges and files',
+        metavar='SQL')
+    parser.add_argument(
+        '--profile',
+        help='print calls and time of each stage of balancing, and files taking most time',
+        action='store_true')
+    parser.add_argument(
+        '--profile-output',
+        help='with --profile, also save cProfile statistics to this file',
+        metavar='FILE')
+    parser.add_argument('-v', '--version', action='version', version=VERSION)
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error('argument -j/--jobs: must not be negative')
+
+    stdin = '-' in args.paths
+    if args.solve and (args.paths or args.stdout or args.inplace or args.watch or args.sweep or args.index or
+                       args.cache):
+        parser.error('argument --solve: not allowed with paths, --stdout, --inplace, --watch, --sweep, --index '
+                     'or --cache')
+    if args.solutions < 1:
+        parser.error('argument --solutions: must be positive')
+    if args.fail_fast and not args.check:
+        parser.error('argument --fail-fast: requires --check')
+    if args.check and (stdin or args.watch or args.sweep or args.index or args.solve):
+        parser.error('argument --check: not allowed with -, --watch, --sweep, --index or --solve')
+    if not args.paths and not args.query and not args.solve:
+        parser.error('the following arguments are required: path')
+    if args.query and not args.index:
+        parser.error('argument --query: requires --index')
+    if args.index and (stdin or args.stdout or args.inplace or args.watch or args.sweep):
+        parser.error('argument --index: not allowed with -, --stdout, --inplace, --watch or --sweep')
+    if args.watch and (stdin or args.stdout or args.inplace):
+        parser.error('argument -w/--watch: not allowed with -, --stdout or --inplace')
+    if args.sweep and (stdin or args.stdout or args.inplace or args.watch or args.cache):
+        parser.error('argument --sweep: not allowed with -, --stdout, --inplace, --watch or --cache')
+
+    # Messages go to standard error when balanced text or CSV goes to standard output
+    to_stdout = stdin or args.stdout or args.sweep or args.query or args.solve or args.check
+    log = sys.stderr if to_stdout else sys.stdout
+    profiler = None
+    if args.profile or args.profile_output:
+        from .profiling import Profiler
+
+        if args.jobs != 1:
+            print('Note: --profile balances files in this process, --jobs is ignored.', file=log)
+            args.jobs = 1
+
+        profiler = Profiler()
+        profiler.enable(args.profile_output is not None)
+
+    try:
+        balance(parser, args, log)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.print_report(log)
+            if args.profile_output:
+                profiler.dump_stats(args.profile_output)
+
+
+# Balances files of arguments, or runs --sweep, --index, --solve or --check
+def balance(parser, args, log):
+    if args.solve:
+        run_solve(parser, args)
+        return
+
+    stdin = '-' in args.paths
+    paths = [path for path in args.paths if path != '-']
+    include = args.include or DEFAULT_INCLUDE
+    balancer = default_balancer(args.cache)
+    files = collect_files(paths, include, args.exclude, Path(PREFIX).resolve())
+    if args.sweep:
+        run_sweep(parser, args, files, balancer)
+        return
+
+    if args.index:
+        run_index(args, paths, files, balancer, log)
+        return
+
+    if args.check:
+        run_check(args, files, balancer, log)
+        return
+
+    errors = []
+    total = skipped = 0
+    if stdin:
+        error = balance_stdin()
+        total += 1
+        if error is not None:
+            errors.append(('-', error))
+
+    file_errors = []
+    count = written = fields = 0
+    if args.stdout:
+        file_errors, count = balance_to_stdout(files, args.jobs, args.cache)
+    elif args.inplace:
+        file_errors, count, _, written, fields = balance_files(None, files, args.jobs, {}, args.cache)
+    elif paths:
+        Path(f'{PREFIX}').mkdir(exist_ok=True)
+        formula = balancer.formula_hash()
+        records = {} if args.force else load_manifest(PREFIX, formula)
+        file_errors, count, skipped, written, fields = balance_files(PREFIX, files, args.jobs, records, args.cache,
+                                                                     args.repack)
+        save_manifest(PREFIX, formula, records)
+
+    errors += file_errors
+    total += count
+    if skipped:
+        print(f'Skipped {skipped} unchanged files.', file=log)
+
+    if count and not args.stdout:
+        print(f'Changed {fields} fields, wrote {written} files.', file=log)
+
+    for file, error in errors:
+        print(f'Error: {file}: {error}', file=log)
+
+    if errors:
+        print(f'Failed to balance {len(errors)} of {total} files.', file=log)
+
+    if args.cache:
+        save_cache(balancer, args.cache, log)
+
+    if args.watch:
+        from .watch import watch
+
+        watch(PREFIX, args.paths, include, args.exclude, balancer, records, args.poll, args.cache, args.repack)
+        return
+
+    if errors:
+        sys.exit(1)
+
+    print('Done.', file=log)
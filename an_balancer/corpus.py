@@ -0,0 +1,206 @@
+import csv
+import sqlite3
+from pathlib import Path, PurePosixPath
+
+from .balancer import FIELDS, find_creatures
+from .document import Document
+from .files import data_hash, default_balancer, is_archive, read_text, run_tasks
+
+# Tables of the index: creatures of each file with their stats as in file and as balanced, "val" of their
+# abilities by type, and ranges of each level stats are corrected within, to find creatures outside of them
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS creatures (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    level, attack, defence, hit_points, min_damage, max_damage, speed, ai_value, fight_value,
+    balanced_attack, balanced_defence, balanced_hit_points, balanced_min_damage, balanced_max_damage,
+    balanced_ai_value, balanced_fight_value
+);
+CREATE INDEX IF NOT EXISTS creatures_file ON creatures (file);
+CREATE INDEX IF NOT EXISTS creatures_level ON creatures (level);
+CREATE TABLE IF NOT EXISTS abilities (creature INTEGER NOT NULL, type TEXT NOT NULL, val);
+CREATE INDEX IF NOT EXISTS abilities_creature ON abilities (creature);
+CREATE INDEX IF NOT EXISTS abilities_type ON abilities (type);
+CREATE TABLE IF NOT EXISTS level_ranges (
+    level INTEGER PRIMARY KEY,
+    attack_min, attack_max, defence_min, defence_max, max_damage_min, max_damage_max, min_damage_lowest,
+    hit_points_min, hit_points_max
+);
+'''
+
+CREATURE_COLUMNS = ('name', 'line', 'start_offset', 'end_offset', 'level', 'attack', 'defence', 'hit_points',
+                    'min_damage', 'max_damage', 'speed', 'ai_value', 'fight_value', 'balanced_attack',
+                    'balanced_defence', 'balanced_hit_points', 'balanced_min_damage', 'balanced_max_damage',
+                    'balanced_ai_value', 'balanced_fight_value')
+
+
+def open_index(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+# Value of a number field of creature, None if it's missing
+def number(index, name):
+    node = index.node.get(name, 'number')
+    return None if node is None else node.value
+
+
+# Parses text of a creature file at path and balances its creatures without writing anything.
+# Returns list of (path, creature row as CREATURE_COLUMNS, abilities as (type, val)), a file holding
+# one creature names it by name
+def read_creatures(text, path, name, balancer):
+    document = Document(text)
+    indexes = find_creatures(document)
+    if not indexes:
+        raise ValueError('no creature found')
+
+    names = {id(node): key for key, node in document.root.value.items()}
+    rows = []
+    for index in indexes:
+        creature = balancer.read_creature(index)
+        row = [names.get(id(index.node), name), text.count('\n', 0, creature.start) + 1,
+               creature.start, creature.end, creature.level, creature.attack, creature.defence,
+               creature.hit_points, creature.min_damage, creature.max_damage, creature.speed,
+               number(index, FIELDS[11]), number(index, FIELDS[12])]
+
+        balancer.balance_procedure(document, index, creature)
+        try:
+            fight_value, ai_value = balancer.creature_values(creature)
+            values = [round(ai_value), round(fight_value)]
+        except ArithmeticError:
+            values = [None, None]
+
+        row += [creature.attack, creature.defence, creature.hit_points, creature.min_damage,
+                creature.max_damage] + values
+        rows.append((path, row, list(creature.abilities.items())))
+
+    return rows
+
+
+# Parses file and balances its creatures without writing anything. Creatures of an archive are recorded
+# with paths of their members, like mod.zip/config/creatures/imps.json, under the archive's hash.
+# Returns (hash of file, list of (path, creature row as CREATURE_COLUMNS, abilities as (type, val)), error,
+# drained score cache)
+def read_file(file_name, cache_file=None):
+    balancer = default_balancer(cache_file)
+    try:
+        if is_archive(file_name):
+            from .archives import creature_texts, member_path
+
+            rows = []
+            for name, text in creature_texts(file_name):
+                try:
+                    rows += read_creatures(text, member_path(file_name, name), PurePosixPath(name).stem, balancer)
+                except Exception as e:
+                    raise ValueError(f'{name}: {type(e).__name__}: {e}') from e
+
+            return data_hash(file_name.read_bytes()), rows, None, balancer.score_cache.drain()
+
+        text = read_text(file_name)
+        rows = read_creatures(text, file_name.as_posix(), file_name.stem, balancer)
+        return data_hash(text.encode('utf-8')), rows, None, balancer.score_cache.drain()
+    except Exception as e:
+        return None, None, f'{type(e).__name__}: {e}', balancer.score_cache.drain()
+
+
+# Removes file from the index with its creatures, and with creatures of its members if it's an archive
+def remove_file(connection, path):
+    creatures = "SELECT id FROM creatures WHERE file = ? OR substr(file, 1, length(?) + 1) = ? || '/'"
+    connection.execute(f'DELETE FROM abilities WHERE creature IN ({creatures})', (path,) * 3)
+    connection.execute(f'DELETE FROM creatures WHERE id IN ({creatures})', (path,) * 3)
+    connection.execute('DELETE FROM files WHERE path = ?', (path,))
+
+
+# Whether file is one of given paths or inside one of them
+def is_covered(file, paths):
+    return any(file == path or path in file.parents for path in paths)
+
+
+# Records creatures of files collected from paths in the index using up to jobs processes. Files whose hash
+# matches the index are skipped, unless formulas changed since they were indexed. Files indexed before under
+# these paths that weren't collected now, because they were deleted or excluded, are removed. Scores computed
+# by workers are merged into score cache of this process' balancer.
+# Returns list of (file, error) and counts of files: all, skipped as unchanged, removed
+def update_index(connection, paths, files, jobs, cache_file=None):
+    balancer = default_balancer(cache_file)
+    formula = balancer.formula_hash()
+    with connection:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'formula'").fetchone()
+        if row is None or row[0] != formula:
+            connection.execute('DELETE FROM abilities')
+            connection.execute('DELETE FROM creatures')
+            connection.execute('DELETE FROM files')
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('formula', ?)", (formula,))
+
+        connection.execute('DELETE FROM level_ranges')
+        for level, ranges in sorted(balancer.level_ranges.items()):
+            attack, defence, max_damage, min_damage_lowest, hit_points = ranges
+            connection.execute('INSERT INTO level_ranges VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               (level,) + attack + defence + max_damage + (min_damage_lowest,) + hit_points)
+
+    hashes = dict(connection.execute('SELECT path, hash FROM files'))
+    collected = set()
+    changed = []
+    errors = []
+    total = skipped = 0
+    for file in files:
+        collected.add(file.as_posix())
+        total += 1
+        try:
+            with file.open('rb') as f:
+                file_hash = data_hash(f.read())
+        except OSError as e:
+            errors.append((file, f'{type(e).__name__}: {e}'))
+            continue
+
+        if hashes.get(file.as_posix()) == file_hash:
+            skipped += 1
+        else:
+            changed.append(file)
+
+    insert = (f'INSERT INTO creatures (file, {", ".join(CREATURE_COLUMNS)}) '
+              f'VALUES (?{", ?" * len(CREATURE_COLUMNS)})')
+    with connection:
+        tasks = ((file, cache_file) for file in changed)
+        for (file, _), (file_hash, rows, error, cache) in run_tasks(read_file, tasks, jobs):
+            balancer.score_cache.merge(*cache)
+            path = file.as_posix()
+            remove_file(connection, path)
+            if error is not None:
+                errors.append((file, error))
+                continue
+
+            connection.execute('INSERT INTO files VALUES (?, ?)', (path, file_hash))
+            for creature_path, row, abilities in rows:
+                creature = connection.execute(insert, [creature_path] + row).lastrowid
+                connection.executemany('INSERT INTO abilities VALUES (?, ?, ?)',
+                                       ((creature, ability_type, val) for ability_type, val in abilities))
+
+        paths = [Path(path) for path in paths]
+        removed = [path for path in hashes if path not in collected and is_covered(Path(path), paths)]
+        for path in removed:
+            remove_file(connection, path)
+
+    return errors, total, skipped, len(removed)
+
+
+# Runs SQL query on the index, writing its columns and rows to output as CSV. Returns number of rows
+def query_index(connection, sql, output):
+    cursor = connection.execute(sql)
+    writer = csv.writer(output, lineterminator='\n')
+    if cursor.description is not None:
+        writer.writerow([column[0] for column in cursor.description])
+
+    count = 0
+    for row in cursor:
+        writer.writerow(row)
+        count += 1
+
+    return count
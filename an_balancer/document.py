@@ -0,0 +1,219 @@
+import json
+import re
+
+# Whitespace and comments, they are skipped by tokenizer and kept as they are in documents. A comment can only
+# be matched whole: backtracking into it when no token follows would find tokens inside the comment
+SPACE_PATTERN = re.compile(r'(?:[\s\ufeff]+|//[^\n]*(?![^\n])|/\*(?:[^*]|\*(?!/))*\*/)*')
+
+# Token of JSON5 text, together with whitespace and comments before it. Groups are numbered rather than named,
+# parse dispatches on match.lastindex, which is cheaper than comparing group names for each token
+TOKEN_PATTERN = re.compile(SPACE_PATTERN.pattern + r'''(?:
+    ([{\[])
+    |([}\]])
+    |(,)
+    |(:)
+    |("[^"\\\n]*(?:\\.[^"\\\n]*)*"|'[^'\\\n]*(?:\\.[^'\\\n]*)*')
+    |([+-]?(?:0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|Infinity|NaN))
+    |([A-Za-z_$][\w$]*)
+)''', re.VERBOSE | re.DOTALL)
+
+# Groups of TOKEN_PATTERN, and kind of token matched by each
+OPEN, CLOSE, COMMA, COLON_TOKEN, STRING, NUMBER, NAME = range(1, 8)
+KINDS = (None, 'punctuation', 'punctuation', 'punctuation', 'punctuation', 'string', 'number', 'name')
+
+LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def syntax_error(text, pos, message):
+    line = text.count('\n', 0, pos) + 1
+    column = pos - text.rfind('\n', 0, pos)
+    return ValueError(f'line {line}, column {column}: {message}')
+
+
+# Splits JSON5 text into tokens, yielding (kind, start offset, end offset) of each.
+# Whitespace and comments are skipped, they are kept as they are since documents are edited by splicing values
+def tokenize(text):
+    pos = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.start() != pos:
+            break
+
+        pos = match.end()
+        yield KINDS[match.lastindex], match.start(match.lastindex), pos
+
+    check_end(text, pos)
+
+
+# Raises an error unless only whitespace and comments follow pos
+def check_end(text, pos):
+    pos = SPACE_PATTERN.match(text, pos).end()
+    if pos < len(text):
+        raise syntax_error(text, pos, f'unexpected character {text[pos]!r}')
+
+
+def decode_token(text, kind, start, end):
+    token = text[start:end]
+    if kind == 'string':
+        if '\\' not in token:
+            return token[1:-1]
+        elif token[0] == "'":
+            token = '"' + token[1:-1].replace("\\'", "'").replace('"', '\\"') + '"'
+
+        return json.loads(token)
+    elif kind == 'number':
+        if token.lstrip('+-')[:2] in ('0x', '0X'):
+            return int(token, 16)
+
+        try:
+            return int(token)
+        except ValueError:
+            return float(token)
+    elif token in LITERALS:
+        return LITERALS[token]
+
+    raise syntax_error(text, start, f'unexpected {token!r}')
+
+
+# Value of a JSON5 document. Start and end are offsets of its text, key holds offsets of its key inside an object.
+# Value of an object is a dict of its members (first one wins for repeated keys), of an array a list of its items
+class Node:
+    __slots__ = ('kind', 'start', 'end', 'value', 'key')
+
+    def __init__(self, kind, start, end, value, key=None):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.value = value
+        self.key = key
+
+    # Returns member with given name if this is an object and the member has given kind, None otherwise
+    def get(self, name, kind=None):
+        if self.kind != 'object':
+            return None
+
+        member = self.value.get(name)
+        if member is None or (kind is not None and member.kind != kind):
+            return None
+
+        return member
+
+
+# States of parse: expecting a value, a value or end of array, a key or end of object, a colon after key,
+# a comma or end of object or array after value, end of file after top-level value
+VALUE, ITEM, KEY, COLON, NEXT, END = range(6)
+
+
+# Parses JSON5 text into tree of nodes, in one pass over its tokens. Tokens are matched here rather than taken
+# from tokenize, as parsing is most of the time of balancing a file and a generator costs a call per token
+def parse(text):
+    root = container = None
+    stack = []
+    name = key = None
+    state = VALUE
+    pos = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.start() != pos:
+            break
+
+        pos = match.end()
+        token = match.lastindex
+        start = match.start(token)
+        if state == NEXT:
+            if token == COMMA:
+                state = KEY if container.kind == 'object' else ITEM
+            elif token == CLOSE and text[start] == ('}' if container.kind == 'object' else ']'):
+                container.end = pos
+                stack.pop()
+                container = stack[-1] if stack else None
+                state = NEXT if stack else END
+            else:
+                raise syntax_error(text, start, 'expected \',\' or end of ' + container.kind)
+        elif state == KEY:
+            if token == NAME:
+                name = text[start:pos]
+                key = (start, pos)
+                state = COLON
+            elif token == STRING or token == NUMBER:
+                name = str(decode_token(text, KINDS[token], start, pos))
+                key = (start, pos)
+                state = COLON
+            elif token == CLOSE and text[start] == '}':
+                container.end = pos
+                stack.pop()
+                container = stack[-1] if stack else None
+                state = NEXT if stack else END
+            else:
+                raise syntax_error(text, start, 'expected key')
+        elif state == COLON:
+            if token != COLON_TOKEN:
+                raise syntax_error(text, start, "expected ':'")
+
+            state = VALUE
+        elif state == END:
+            raise syntax_error(text, start, 'expected end of file')
+        elif state == ITEM and token == CLOSE and text[start] == ']':
+            container.end = pos
+            stack.pop()
+            container = stack[-1] if stack else None
+            state = NEXT if stack else END
+        else:
+            if token == OPEN:
+                if text[start] == '{':
+                    node = Node('object', start, pos, {})
+                    state = KEY
+                else:
+                    node = Node('array', start, pos, [])
+                    state = ITEM
+            elif token >= STRING:
+                node = Node(KINDS[token], start, pos, decode_token(text, KINDS[token], start, pos))
+                state = NEXT if stack else END
+            else:
+                raise syntax_error(text, start, 'expected value')
+
+            if container is None:
+                root = node
+            elif container.kind == 'object':
+                node.key = key
+                container.value.setdefault(name, node)
+            else:
+                container.value.append(node)
+
+            if token == OPEN:
+                stack.append(node)
+                container = node
+
+    check_end(text, pos)
+    if state != END:
+        raise syntax_error(text, len(text), 'unexpected end of file')
+
+    return root
+
+
+# JSON5 file parsed with comments and formatting kept: values are changed by splicing new text
+# over their offsets, and all edits are applied in one pass when the document is rendered
+class Document:
+    def __init__(self, text):
+        self.text = text
+        self.root = parse(text)
+        self.edits = {}
+
+    # Edits value of node, an edit leaving the text as it is isn't recorded so edits list only real changes
+    def replace(self, node, value):
+        node.value = value
+        text = str(value)
+        if text == self.text[node.start:node.end]:
+            self.edits.pop(node.start, None)
+        else:
+            self.edits[node.start] = (node.end, text)
+
+    def render(self):
+        pieces = []
+        pos = 0
+        for start in sorted(self.edits):
+            end, text = self.edits[start]
+            pieces.append(self.text[pos:start])
+            pieces.append(text)
+            pos = end
+
+        pieces.append(self.text[pos:])
+        return ''.join(pieces)
@@ -0,0 +1,280 @@
+import json
+import os
+import sys
+from collections import deque
+from fnmatch import fnmatch
+from pathlib import Path
+
+from .balancer import Balancer
+from .document import Document
+
+# File in output directory recording what was balanced by previous runs
+MANIFEST = '.manifest.json'
+
+# Balancer of this process with default tables, created on first use so each pool worker loads tables once
+BALANCER = None
+
+
+# Returns balancer of this process, its score cache is loaded from cache_file when the balancer is created
+def default_balancer(cache_file=None):
+    global BALANCER
+    if BALANCER is None:
+        BALANCER = Balancer()
+        if cache_file is not None:
+            BALANCER.score_cache.load(cache_file, BALANCER.formula_hash())
+
+    return BALANCER
+
+
+# Reads text of file as it is, keeping its line endings
+def read_text(path):
+    with path.open(encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+# Writes text to a temporary file next to path and renames it over path, so path never holds a partial file
+def write_atomic(path, text):
+    temp_file = path.with_name(f'.{path.name}.tmp')
+    with temp_file.open('w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+    if path.exists():
+        import shutil
+
+        shutil.copymode(path, temp_file)
+
+    os.replace(temp_file, path)
+
+
+# Writes text to path in one write unless path already holds the same text, so unchanged files keep their mtime.
+# Returns True if file was written
+def write_if_changed(path, text):
+    data = text.encode('utf-8')
+    try:
+        if path.stat().st_size == len(data):
+            with path.open('rb') as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    with path.open('wb') as f:
+        f.write(data)
+
+    return True
+
+
+# Whether file is a zip archive of a mod, whose creature files are balanced without extracting them
+def is_archive(path):
+    return path.suffix.lower() == '.zip'
+
+
+# Balances file into the same path under prefix directory, or replaces the file itself when prefix is None.
+# Creature files of archives are balanced as described by create_balanced_archive, into a copy of the archive
+# when repack is True. Returns (number of changed fields, number of files written), files already balanced
+# aren't written
+def create_balanced_file(prefix, file_name, balancer=None, repack=False):
+    if is_archive(file_name):
+        from .archives import create_balanced_archive
+
+        return create_balanced_archive(prefix, file_name, balancer or default_balancer(), repack)
+
+    document = Document(read_text(file_name))
+    (balancer or default_balancer()).correct_values(document)
+    if prefix is None:
+        if not document.edits:
+            return 0, False
+
+        write_atomic(file_name, document.render())
+        return len(document.edits), True
+
+    return len(document.edits), write_if_changed(Path(f'{prefix}/{file_name}'), document.render())
+
+
+# Hash of data already read, like text of a file encoded as UTF-8
+def data_hash(data):
+    import hashlib
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    import hashlib
+
+    try:
+        with path.open('rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+# Hash of balanced output at path: of the file, or when tree is True of names and contents of files under
+# the directory that creature files of an archive are balanced into. None if there's no such output
+def output_hash(path, tree=False):
+    import hashlib
+
+    if path.is_dir() != tree:
+        return None
+
+    if not tree:
+        return file_hash(path)
+
+    digest = hashlib.sha256()
+    for file in sorted(file for file in path.rglob('*') if file.is_file()):
+        digest.update(file.relative_to(path).as_posix().encode('utf-8') + b'\0' + file_hash(file).encode())
+
+    return digest.hexdigest()
+
+
+# Manifest maps each balanced file to hashes of its input and output, it's discarded when formulas change
+def load_manifest(prefix, formula):
+    try:
+        with Path(f'{prefix}/{MANIFEST}').open() as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+    if manifest.get('formula') != formula:
+        return {}
+
+    return manifest.get('files', {})
+
+
+def save_manifest(prefix, formula, records):
+    manifest_file = Path(f'{prefix}/{MANIFEST}')
+    temp_file = Path(f'{manifest_file}.tmp')
+    with temp_file.open('w') as f:
+        json.dump({'formula': formula, 'files': records}, f, indent=4, sort_keys=True)
+
+    os.replace(temp_file, manifest_file)
+
+
+# Balances one file unless it and its output match the manifest record, files balanced in place have no records.
+# Returns (new record, result of create_balanced_file or None if file was skipped, error, drained score cache),
+# the error is returned instead of raised so one broken file doesn't stop the run
+def try_create_balanced_file(prefix, file_name, record, cache_file=None, repack=False):
+    balancer = default_balancer(cache_file)
+    try:
+        if prefix is None:
+            return None, create_balanced_file(prefix, file_name, balancer), None, balancer.score_cache.drain()
+
+        input_hash = file_hash(file_name)
+        balanced_file = Path(f'{prefix}/{file_name}')
+        tree = is_archive(file_name) and not repack
+        if record is not None and record['input'] == input_hash and \
+                record['output'] == output_hash(balanced_file, tree):
+            return record, None, None, balancer.score_cache.drain()
+
+        result = create_balanced_file(prefix, file_name, balancer, repack)
+        record = {'input': input_hash, 'output': output_hash(balanced_file, tree)}
+        return record, result, None, balancer.score_cache.drain()
+    except Exception as e:
+        return None, None, f'{type(e).__name__}: {e}', balancer.score_cache.drain()
+
+
+# Balances one file and returns (balanced text, error, drained score cache), the error is returned instead of raised
+def try_balance_text(file_name, cache_file=None):
+    balancer = default_balancer(cache_file)
+    try:
+        if is_archive(file_name):
+            from .archives import balance_archive_text
+
+            return balance_archive_text(file_name, balancer), None, balancer.score_cache.drain()
+
+        return balancer.balance_text(read_text(file_name)), None, balancer.score_cache.drain()
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}', balancer.score_cache.drain()
+
+
+# Calls function with arguments of each task in up to jobs processes, yielding (task, result) in order of tasks.
+# Only a few tasks per process are queued at once, so balancing starts while directories are still being walked
+def run_tasks(function, tasks, jobs):
+    if jobs == 1:
+        for task in tasks:
+            yield task, function(*task)
+
+        return
+
+    # Imported here as it takes longer than the rest of balancer, and isn't needed by runs with one job
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append((task, executor.submit(function, *task)))
+            if len(pending) >= workers * 4:
+                task, future = pending.popleft()
+                yield task, future.result()
+
+        while pending:
+            task, future = pending.popleft()
+            yield task, future.result()
+
+
+# Balances given files using up to jobs processes, updating records of the manifest, prefix is None to balance
+# files in place. Scores computed by workers are merged into score cache of this process' balancer.
+# Returns list of (file, error) in order of files and counts of files: all, skipped as unchanged
+# since last run and written, with number of fields changed by balancing
+def balance_files(prefix, files, jobs, records, cache_file=None, repack=False):
+    tasks = ((prefix, file, records.get(file.as_posix()), cache_file, repack) for file in files)
+    score_cache = default_balancer(cache_file).score_cache
+    errors = []
+    total = skipped = written = fields = 0
+    for (_, file, _, _, _), (record, result, error, cache) in run_tasks(try_create_balanced_file, tasks, jobs):
+        score_cache.merge(*cache)
+        total += 1
+        if error is not None:
+            records.pop(file.as_posix(), None)
+            errors.append((file, error))
+            continue
+
+        if record is not None:
+            records[file.as_posix()] = record
+
+        if result is None:
+            skipped += 1
+        else:
+            fields += result[0]
+            written += result[1]
+
+    return errors, total, skipped, written, fields
+
+
+def matches_any(path, patterns):
+    return any(fnmatch(path.name, pattern) or fnmatch(path.as_posix(), pattern) for pattern in patterns)
+
+
+# Returns True if path is directory or inside it, directory must be resolved
+def is_inside(path, directory):
+    path = path.resolve()
+    return path == directory or directory in path.parents
+
+
+# Yields files under directory and its subdirectories, as they are listed.
+# Files must match one of include patterns, files and directories matching exclude patterns are skipped.
+# Output directory (resolved) is skipped too, so balanced files aren't taken for input when it's walked
+def walk_files(directory, include, exclude, output=None):
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            path = Path(entry.path)
+            if matches_any(path, exclude):
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                if output is None or not is_inside(path, output):
+                    yield from walk_files(path, include, exclude, output)
+            elif entry.is_file() and matches_any(path, include):
+                yield path
+
+
+# Yields files to balance from given paths, directories are walked recursively without entering output directory
+def collect_files(paths, include, exclude, output=None):
+    for item in paths:
+        path = Path(item)
+        if path.is_dir():
+            yield from walk_files(path, include, exclude, output)
+        elif path.is_file():
+            yield path
+        else:
+            print(f'Warning: {path} is not file nor directory', file=sys.stderr)
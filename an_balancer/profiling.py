@@ -0,0 +1,140 @@
+import cProfile
+import functools
+import sys
+import time
+
+# Modules of all options are imported, so that functions they import by name are patched in them too
+from . import archives, balancer, check, cli, corpus, document, files, sweep, watch
+
+# Stages timed by --profile, as (stage, functions as (owner, name)). Functions are wrapped only while profiling,
+# so balancing runs the very same code without any hooks when it's disabled. Times include nested stages:
+# calculate_values is also counted in creature_values, replace_value also in balance_procedure.
+# Functions are listed in the module defining them, modules importing them by name are patched too
+STAGES = (
+    ('read', ((files, 'read_text'),)),
+    ('hash', ((files, 'file_hash'), (files, 'data_hash'))),
+    ('parse', ((document.Document, '__init__'),)),
+    ('index', ((balancer, 'find_creatures'),)),
+    ('balance_procedure', ((balancer.Balancer, 'balance_procedure'),)),
+    ('creature_values', ((balancer.Balancer, 'creature_values'),)),
+    ('calculate_values', ((balancer.Balancer, 'calculate_values'),)),
+    ('replace_value', ((balancer, 'replace_value'), (balancer, 'replace_value_min_max'))),
+    ('write', ((files, 'write_if_changed'), (files, 'write_atomic'), (archives, 'write_archive'),
+               (archives, 'replace_if_changed')))
+)
+
+# Functions balancing one file, as (owner, name, position of file argument), time of each file is counted from them
+FILE_FUNCTIONS = (
+    (files, 'try_create_balanced_file', 1),
+    (files, 'try_balance_text', 0),
+    (check, 'check_file', 0),
+    (corpus, 'read_file', 0),
+    (watch.Rebalancer, 'balance_file', 1)
+)
+
+# Number of files listed in report as slowest, and their columns as (title, stage)
+SLOWEST_FILES = 10
+SLOWEST_COLUMNS = (('read', 'read'), ('parse', 'parse'), ('index', 'index'), ('balance', 'balance_procedure'),
+                   ('values', 'creature_values'), ('write', 'write'))
+
+
+# Records calls and wall time of each stage for each file while enabled, optionally running cProfile too
+class Profiler:
+    def __init__(self):
+        self.files = {}
+        self.current = self.files.setdefault('-', {})
+        self.originals = []
+        self.profile = None
+
+    def add(self, stage, elapsed):
+        record = self.current.setdefault(stage, [0, 0.0])
+        record[0] += 1
+        record[1] += elapsed
+
+    def timed(self, stage, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def timed_file(self, function, position):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            self.current = self.files.setdefault(str(args[position]), {})
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add('total', time.perf_counter() - start)
+
+        return wrapper
+
+    # Replaces function of owner by its wrapper. A module function is replaced in every module of the package
+    # holding it, as modules importing it by name call their own binding
+    def patch(self, owner, name, wrapper):
+        original = owner.__dict__[name]
+        owners = [owner]
+        if not isinstance(owner, type):
+            owners = [module for key, module in list(sys.modules.items())
+                      if key.split('.')[0] == __package__ and getattr(module, name, None) is original]
+
+        wrapped = wrapper(original)
+        for module in owners:
+            self.originals.append((module, name, original))
+            setattr(module, name, wrapped)
+
+    # Wraps functions of all stages, and starts cProfile if with_cprofile is True
+    def enable(self, with_cprofile=False):
+        for stage, functions in STAGES:
+            for owner, name in functions:
+                self.patch(owner, name, functools.partial(self.timed, stage))
+
+        for owner, name, position in FILE_FUNCTIONS:
+            self.patch(owner, name, functools.partial(self.timed_file, position=position))
+
+        if with_cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    # Restores all wrapped functions and stops cProfile
+    def disable(self):
+        if self.profile is not None:
+            self.profile.disable()
+
+        while self.originals:
+            owner, name, original = self.originals.pop()
+            setattr(owner, name, original)
+
+    def dump_stats(self, path):
+        self.profile.dump_stats(path)
+
+    def print_report(self, file):
+        stages = [stage for stage, _ in STAGES]
+        totals = {}
+        for record in self.files.values():
+            for stage, (calls, elapsed) in record.items():
+                total = totals.setdefault(stage, [0, 0.0])
+                total[0] += calls
+                total[1] += elapsed
+
+        print(f'{"Stage":<20}{"Calls":>10}{"Time (ms)":>12}', file=file)
+        for stage in stages + ['total']:
+            calls, elapsed = totals.get(stage, (0, 0.0))
+            print(f'{stage:<20}{calls:>10}{elapsed * 1000:>12.1f}', file=file)
+
+        timed = [(record['total'][1], name, record) for name, record in self.files.items() if 'total' in record]
+        slowest = sorted(timed, key=lambda item: item[0], reverse=True)[:SLOWEST_FILES]
+        if not slowest:
+            return
+
+        print(file=file)
+        print('Slowest files, time of stages (ms):', file=file)
+        print(f'{"total":>9}' + ''.join(f'{title:>9}' for title, _ in SLOWEST_COLUMNS) + '  file', file=file)
+        for elapsed, name, record in slowest:
+            times = ''.join(f'{record.get(stage, (0, 0.0))[1] * 1000:>9.2f}' for _, stage in SLOWEST_COLUMNS)
+            print(f'{elapsed * 1000:>9.2f}{times}  {name}', file=file)
@@ -0,0 +1,197 @@
+import csv
+import heapq
+import json
+
+from .balancer import Creature, ability_reductions, scored_damage
+
+# Stats that can be fixed by --solve, as NAME=VALUE
+STATS = ('attack', 'defence', 'hit_points', 'min_damage', 'max_damage', 'speed')
+
+
+# Parses constraints of --solve given as NAME=VALUE, where name is one of:
+# - level: level of creature, required
+# - fight or ai: target fight or AI value, exactly one is required
+# - attack, defence, hit_points, min_damage, max_damage or speed: stat fixed to value
+# - ability.TYPE or ability.TYPE=VAL: ability creature has, with its "val" (0 if not given)
+# Returns (level, "fight" or "ai", target value, dict of fixed stats, dict of "val" of abilities by type)
+def parse_constraints(texts):
+    level = kind = target = None
+    fixed = {}
+    abilities = {}
+    for text in texts:
+        name, separator, value = text.partition('=')
+        if name.startswith('ability.') and len(name) > len('ability.') and not separator:
+            abilities[name[len('ability.'):]] = 0
+            continue
+
+        try:
+            value = json.loads(value) if separator else None
+        except ValueError:
+            value = None
+
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f'expected NAME=NUMBER, got {text!r}')
+
+        if name.startswith('ability.') and len(name) > len('ability.'):
+            abilities[name[len('ability.'):]] = value
+        elif name in ('fight', 'ai'):
+            if kind is not None and kind != name:
+                raise ValueError('only one of fight and ai can be targeted')
+
+            kind = name
+            target = value
+        elif name == 'level' or name in STATS:
+            if value != int(value):
+                raise ValueError(f'{name} must be a whole number')
+
+            if name == 'level':
+                level = int(value)
+            else:
+                fixed[name] = int(value)
+        else:
+            raise ValueError(f'unknown constraint {name!r}')
+
+    if level is None or kind is None:
+        raise ValueError('level=N and fight=VALUE or ai=VALUE are required')
+
+    return level, kind, target, fixed, abilities
+
+
+# Position of value in range from low to high: 0 in the middle and 1 at either end.
+# Of candidates equally close to the target, those with stats closer to middles of ranges are preferred
+def off_center(value, low, high):
+    return abs(2 * value - low - high) / max(high - low, 1)
+
+
+# Groups values by key, returns {key: value closest to middle of range from low to high}
+def group_by(values, key, low, high):
+    groups = {}
+    for value in values:
+        group = key(value)
+        if group not in groups or off_center(value, low, high) < off_center(groups[group], low, high):
+            groups[group] = value
+
+    return groups
+
+
+# Speeds to try when speed isn't fixed: the lowest speed of each multiplier of speed_bonus
+def band_speeds(speed_bonus):
+    thresholds = sorted(lowest_speed for lowest_speed, _ in speed_bonus)
+    return thresholds[:1] + [lowest_speed + 1 for lowest_speed in thresholds] if thresholds else [0]
+
+
+# Searches stats of a creature of level, within ranges balance_procedure corrects them to, whose fight or AI
+# value (kind) is closest to target. Values grow with every stat, which the search relies on:
+# - attacks and defences are grouped by their results of calc_att_damage and calc_def_damage, and damages by
+#   their damage as scored, as all members of a group score the same
+# - hit points are found by bisection for each combination of groups
+# - combinations whose weakest and strongest stats can't get closer to target than the count best candidates
+#   found so far are skipped, and so are the stronger damages once values overshoot by more than that
+# Returns list of up to count creature records with their rounded (fight value, AI value), best first,
+# and number of creatures scored. Raises ValueError when level has no ranges or a fixed stat is out of its range
+def solve(balancer, level, kind, target, fixed, abilities, count):
+    if level not in balancer.level_ranges:
+        raise ValueError(f'level {level} has no ranges')
+
+    attack_range, defence_range, max_damage_range, min_damage_lowest, hit_points_range = balancer.level_ranges[level]
+    level_ranges = {'attack': attack_range, 'defence': defence_range, 'hit_points': hit_points_range,
+                    'max_damage': max_damage_range, 'min_damage': (min_damage_lowest, max_damage_range[1])}
+    ranges = dict(level_ranges)
+    for name, value in fixed.items():
+        if name in ranges:
+            low, high = ranges[name]
+            if not low <= value <= high:
+                raise ValueError(f'{name} {value} is out of range {low}-{high} of level {level}')
+
+            ranges[name] = (value, value)
+
+    general_attack_reduction, enemy_defence_reduction = ability_reductions(abilities)
+    attacks = group_by(range(ranges['attack'][0], ranges['attack'][1] + 1),
+                       lambda attack: balancer.calc_att_damage(attack, enemy_defence_reduction), *attack_range)
+
+    # Defences taking no damage from standard creatures can't be scored
+    defences = group_by(range(ranges['defence'][0], ranges['defence'][1] + 1),
+                        lambda defence: balancer.calc_def_damage(defence, general_attack_reduction), *defence_range)
+    defences.pop(0, None)
+
+    damages = {}
+    for max_damage in range(ranges['max_damage'][0], ranges['max_damage'][1] + 1):
+        for min_damage in range(ranges['min_damage'][0], min(ranges['min_damage'][1], max_damage) + 1):
+            min_scored, max_scored = scored_damage(abilities, min_damage, max_damage)
+            damage = balancer.dmg_factor * max_scored + (1 - balancer.dmg_factor) * min_scored
+            off = off_center(max_damage, *max_damage_range) + off_center(min_damage, min_damage_lowest, max_damage)
+            if damage not in damages or off < damages[damage][0]:
+                damages[damage] = (off, max_damage, min_damage)
+
+    damages = [damages[damage][1:] for damage in sorted(damages)]
+    speeds = [fixed['speed']] if 'speed' in fixed else band_speeds(balancer.speed_bonus)
+    mask = balancer.ability_mask(abilities)
+    low_hit_points, high_hit_points = ranges['hit_points']
+    scored = 0
+
+    def value(attack, defence, hit_points, damage, speed):
+        nonlocal scored
+        scored += 1
+        creature = Creature(level, attack, defence, hit_points, damage[0], damage[1], speed, abilities, mask)
+        return round(balancer.creature_values(creature)[0 if kind == 'fight' else 1])
+
+    # Heap of best candidates as (-error, -off center, order, stats), worst one first
+    best = []
+
+    def worst():
+        return -best[0][0] if len(best) == count else float('inf')
+
+    def add(attack, defence, hit_points, damage, speed):
+        error = abs(value(attack, defence, hit_points, damage, speed) - target)
+        off = (off_center(attack, *attack_range) + off_center(defence, *defence_range) +
+               off_center(hit_points, *hit_points_range) + off_center(damage[0], *max_damage_range) +
+               off_center(damage[1], min_damage_lowest, damage[0]))
+        item = (-error, -off, -scored, (attack, defence, hit_points, damage, speed))
+        if len(best) < count:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    for speed in speeds:
+        for attack in attacks.values():
+            for defence in defences.values():
+                if not damages:
+                    continue
+
+                if value(attack, defence, high_hit_points, damages[-1], speed) < target - worst() or \
+                        value(attack, defence, low_hit_points, damages[0], speed) > target + worst():
+                    continue
+
+                for damage in damages:
+                    if value(attack, defence, low_hit_points, damage, speed) > target + worst():
+                        break
+
+                    # Lowest hit points reaching target, the one below it may be closer
+                    low, high = low_hit_points, high_hit_points
+                    while low < high:
+                        middle = (low + high) // 2
+                        if value(attack, defence, middle, damage, speed) >= target:
+                            high = middle
+                        else:
+                            low = middle + 1
+
+                    add(attack, defence, low, damage, speed)
+                    if low > low_hit_points:
+                        add(attack, defence, low - 1, damage, speed)
+
+    candidates = []
+    for _, _, _, (attack, defence, hit_points, damage, speed) in sorted(best, reverse=True):
+        creature = Creature(level, attack, defence, hit_points, damage[0], damage[1], speed, abilities, mask)
+        fight_value, ai_value = balancer.creature_values(creature)
+        candidates.append((creature, round(fight_value), round(ai_value)))
+
+    return candidates, scored
+
+
+def write_candidates(candidates, output):
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(['level', 'attack', 'defence', 'hitPoints', 'minDamage', 'maxDamage', 'speed', 'fightValue',
+                     'aiValue'])
+    for creature, fight_value, ai_value in candidates:
+        writer.writerow([creature.level, creature.attack, creature.defence, creature.hit_points, creature.min_damage,
+                         creature.max_damage, creature.speed, fight_value, ai_value])
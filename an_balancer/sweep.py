@@ -0,0 +1,152 @@
+import copy
+import csv
+import itertools
+import json
+import os
+from pathlib import PurePosixPath
+
+from .balancer import Balancer, find_creatures
+from .document import Document
+from .files import is_archive, read_text, run_tasks
+
+
+# Parses parameter of a sweep given as NAME=VALUE[,VALUE...], where name is one of:
+# - a number of tables: dmg_factor, prot_power_fight, prot_power_ai, mul_fight or mul_ai
+# - fight.ABILITY or ai.ABILITY: bonus of ability to fight or AI value (percents)
+# - speed.N: multiplier of values of creatures faster than speed N
+# Returns (name, list of values)
+def parse_parameter(text):
+    name, separator, values = text.partition('=')
+    if not separator or not name:
+        raise ValueError(f'expected NAME=VALUE[,VALUE...], got {text!r}')
+
+    try:
+        values = [json.loads(value) for value in values.split(',')]
+    except ValueError:
+        values = None
+
+    if not values or not all(isinstance(value, (int, float)) for value in values):
+        raise ValueError(f'values of {name} must be numbers')
+
+    return name, values
+
+
+# Sets parameter of a sweep in tables, raises ValueError if there's no such parameter
+def set_parameter(tables, name, value):
+    kind, _, key = name.partition('.')
+    if not key and isinstance(tables.get(name), (int, float)):
+        tables[name] = value
+    elif kind in ('fight', 'ai') and key:
+        for ability in tables['abilities']:
+            if ability[0] == key:
+                ability[1 if kind == 'fight' else 2] = value
+                return
+
+        raise ValueError(f'unknown ability {key!r}')
+    elif kind == 'speed' and key:
+        speed = json.loads(key)
+        for bonus in tables['speed_bonus']:
+            if bonus[0] == speed:
+                bonus[1] = value
+                return
+
+        tables['speed_bonus'].append([speed, value])
+    else:
+        raise ValueError(f'unknown parameter {name!r}')
+
+
+# Tables of each combination of values of parameters, as list of (values, tables)
+def make_sets(tables, parameters):
+    sets = []
+    for values in itertools.product(*(values for _, values in parameters)):
+        variant = copy.deepcopy(tables)
+        for (name, _), value in zip(parameters, values):
+            set_parameter(variant, name, value)
+
+        sets.append((values, variant))
+
+    return sets
+
+
+# Parses text of a creature file at path and corrects stats of its creatures.
+# Returns list of (path, name of creature, creature record), a file holding one creature names it by name
+def read_creatures(text, path, name, balancer):
+    document = Document(text)
+    indexes = find_creatures(document)
+    if not indexes:
+        raise ValueError('no creature found')
+
+    names = {id(node): key for key, node in document.root.value.items()}
+    creatures = []
+    for index in indexes:
+        creature = balancer.read_creature(index)
+        balancer.balance_procedure(document, index, creature)
+        creatures.append((path, names.get(id(index.node), name), creature))
+
+    return creatures
+
+
+# Parses files and corrects stats of their creatures once, none of these depend on swept parameters.
+# Creatures of archives are named by paths of their members, like mod.zip/config/creatures/imps.json.
+# Returns list of (file, name of creature, creature record) and list of (file, error)
+def load_creatures(files, balancer):
+    creatures = []
+    errors = []
+    for file in files:
+        try:
+            if not is_archive(file):
+                creatures += read_creatures(read_text(file), file.as_posix(), file.stem, balancer)
+                continue
+
+            from .archives import creature_texts, member_path
+
+            members = []
+            for name, text in creature_texts(file):
+                try:
+                    members += read_creatures(text, member_path(file, name), PurePosixPath(name).stem, balancer)
+                except Exception as e:
+                    raise ValueError(f'{name}: {type(e).__name__}: {e}') from e
+
+            creatures += members
+        except Exception as e:
+            errors.append((file, f'{type(e).__name__}: {e}'))
+
+    return creatures, errors
+
+
+# Scores creatures with each set, returns rows of values of parameters, creature and its fight and AI values.
+# Values of a creature failing to be scored are left empty
+def score_sets(creatures, sets):
+    rows = []
+    for values, tables in sets:
+        balancer = Balancer(tables)
+        for file, name, creature in creatures:
+            try:
+                fight_value, ai_value = balancer.creature_values(creature)
+                fight_value = round(fight_value)
+                ai_value = round(ai_value)
+            except ArithmeticError:
+                fight_value = ai_value = ''
+
+            rows.append(list(values) + [file, name, creature.level, fight_value, ai_value])
+
+    return rows
+
+
+# Scores creatures of files with tables of each combination of parameters, in up to jobs processes.
+# Rows are written to output as CSV in order of sets, as soon as each group of sets is scored.
+# Returns list of (file, error), number of creatures and number of sets
+def sweep(files, parameters, jobs, output, balancer):
+    creatures, errors = load_creatures(files, balancer)
+    sets = make_sets(balancer.tables, parameters)
+    workers = jobs or os.cpu_count() or 1
+    size = max(1, len(sets) // (workers * 4))
+    tasks = ((creatures, sets[start:start + size]) for start in range(0, len(sets), size))
+
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow([name for name, _ in parameters] + ['file', 'creature', 'level', 'fightValue', 'aiValue'])
+    for _, rows in run_tasks(score_sets, tasks, jobs):
+        writer.writerows(rows)
+        output.flush()
+
+    return errors, len(creatures), len(sets)
@@ -0,0 +1,270 @@
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+from .balancer import find_creatures
+from .document import Document
+from .files import (data_hash, file_hash, is_archive, is_inside, matches_any, output_hash, read_text,
+                    save_manifest, walk_files, write_if_changed)
+
+# Seconds between scans of input paths when inotify isn't available
+POLL_INTERVAL = 0.5
+
+# inotify events of a file written and closed or moved into a watched directory, and of a directory created
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_ISDIR = 0x40000000
+IN_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+IN_EVENT = struct.Struct('iIII')
+
+
+# Balances files as they change, keeping everything from previous changes that can be reused: the balancer
+# with its damage tables, the last text of each file, and edits of each creature keyed by the creature's text.
+# Creatures whose text didn't change get their previous edits back instead of being balanced again.
+# Archives are balanced whole when their hash changes, into a copy of the archive when repack is True
+class Rebalancer:
+    def __init__(self, prefix, balancer, records, repack=False):
+        self.prefix = prefix
+        self.balancer = balancer
+        self.records = records
+        self.repack = repack
+        self.texts = {}
+        self.creatures = {}
+        self.archives = {}
+
+    # Balances file unless its text didn't change since last time.
+    # Returns (number of creatures balanced, number of creatures, number of changed fields, whether output was written)
+    # or None if file wasn't balanced
+    def balance_file(self, file_name):
+        try:
+            text = read_text(file_name)
+        except FileNotFoundError:
+            self.texts.pop(file_name, None)
+            self.creatures.pop(file_name, None)
+            return None
+
+        if self.texts.get(file_name) == text:
+            return None
+
+        document = Document(text)
+        indexes = find_creatures(document)
+        if not indexes:
+            raise ValueError('no creature found')
+
+        cached = self.creatures.get(file_name, {})
+        creatures = {}
+        balanced = 0
+        for index in indexes:
+            start = index.node.start
+            end = index.node.end
+            block = text[start:end]
+            edits = cached.get(block)
+            if edits is None:
+                self.balancer.correct_creature(document, index)
+                edits = {key - start: (value[0] - start, value[1]) for key, value in document.edits.items()
+                         if start <= key < end}
+                balanced += 1
+            else:
+                for key, value in edits.items():
+                    document.edits[key + start] = (value[0] + start, value[1])
+
+            creatures[block] = edits
+
+        output = document.render()
+        written = write_if_changed(Path(f'{self.prefix}/{file_name}'), output)
+
+        self.texts[file_name] = text
+        self.creatures[file_name] = creatures
+        self.records[file_name.as_posix()] = {
+            'input': data_hash(text.encode('utf-8')),
+            'output': data_hash(output.encode('utf-8'))
+        }
+        return balanced, len(indexes), len(document.edits), written
+
+    # Balances archive unless its hash didn't change since last time.
+    # Returns (number of changed fields, number of files written) or None if archive wasn't balanced
+    def balance_archive(self, file_name):
+        from .archives import create_balanced_archive
+
+        input_hash = file_hash(file_name)
+        if input_hash is None:
+            self.archives.pop(file_name, None)
+            return None
+
+        if self.archives.get(file_name) == input_hash:
+            return None
+
+        result = create_balanced_archive(self.prefix, file_name, self.balancer, self.repack)
+        self.archives[file_name] = input_hash
+        self.records[file_name.as_posix()] = {
+            'input': input_hash,
+            'output': output_hash(Path(f'{self.prefix}/{file_name}'), not self.repack)
+        }
+        return result
+
+
+# Returns libc if it provides inotify, None otherwise
+def load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+
+    import ctypes
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+# Sets up inotify watches of input paths and returns a generator yielding lists of changed files.
+# Directories are watched with all their subdirectories, new subdirectories are watched as they appear.
+# Raises OSError when inotify can't be used, for example when the limit of watches is reached
+def watch_inotify(libc, paths, include, exclude, output):
+    import ctypes
+
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    directories = {}
+    recursive = set()
+    files = set()
+
+    def add_watch(directory, walk):
+        wd = libc.inotify_add_watch(fd, os.fsencode(str(directory)), IN_WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f'inotify_add_watch failed on {directory}: {os.strerror(error)}')
+
+        directories[wd] = directory
+        if walk:
+            recursive.add(wd)
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    path = Path(entry.path)
+                    if entry.is_dir(follow_symlinks=False) and not matches_any(path, exclude) \
+                            and not is_inside(path, output):
+                        add_watch(path, True)
+
+    try:
+        for item in paths:
+            path = Path(item)
+            if path.is_dir():
+                add_watch(path, True)
+            elif path.is_file():
+                files.add(path)
+                if path.parent not in directories.values():
+                    add_watch(path.parent, False)
+    except OSError:
+        os.close(fd)
+        raise
+
+    def changes():
+        while True:
+            data = os.read(fd, 65536)
+            changed = {}
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = IN_EVENT.unpack_from(data, pos)
+                name = data[pos + IN_EVENT.size:pos + IN_EVENT.size + length].rstrip(b'\0')
+                pos += IN_EVENT.size + length
+                directory = directories.get(wd)
+                if directory is None or not name:
+                    continue
+
+                path = directory / os.fsdecode(name)
+                if path in files:
+                    changed[path] = None
+                elif wd not in recursive or matches_any(path, exclude) or is_inside(path, output):
+                    continue
+                elif mask & IN_ISDIR:
+                    add_watch(path, True)
+                    changed.update(dict.fromkeys(walk_files(path, include, exclude, output)))
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and matches_any(path, include):
+                    changed[path] = None
+
+            yield list(changed)
+
+    return changes()
+
+
+# Generator yielding lists of files changed since previous scan of input paths, comparing their mtime and size
+def watch_polling(paths, include, exclude, output):
+    def scan():
+        stats = {}
+        for item in paths:
+            path = Path(item)
+            files = walk_files(path, include, exclude, output) if path.is_dir() else [path]
+            for file in files:
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+
+                stats[file] = (stat.st_mtime_ns, stat.st_size)
+
+        return stats
+
+    stats = scan()
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = scan()
+        yield [file for file, stat in current.items() if stats.get(file) != stat]
+        stats = current
+
+
+# Balances input files as they are saved, until interrupted. Output directory is never watched,
+# so balanced files written inside a watched directory don't trigger balancing again.
+# Score cache of balancer is saved to cache_file when stopped
+def watch(prefix, paths, include, exclude, balancer, records, poll=False, cache_file=None, repack=False):
+    output = Path(prefix).resolve()
+    rebalancer = Rebalancer(prefix, balancer, records, repack)
+    formula = balancer.formula_hash()
+
+    changes = None
+    libc = None if poll else load_inotify()
+    if libc is not None:
+        try:
+            changes = watch_inotify(libc, paths, include, exclude, output)
+        except OSError as e:
+            print(f'Warning: {e}, watching by polling')
+
+    if changes is None:
+        changes = watch_polling(paths, include, exclude, output)
+
+    print('Watching for changes, press Ctrl+C to stop.')
+    try:
+        for changed in changes:
+            for file in changed:
+                if is_inside(file, output):
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    result = rebalancer.balance_archive(file) if is_archive(file) else rebalancer.balance_file(file)
+                except Exception as e:
+                    print(f'Error: {file}: {type(e).__name__}: {e}')
+                    continue
+
+                elapsed = (time.perf_counter() - start) * 1000
+                if result is not None and is_archive(file):
+                    print(f'Balanced {file}: {result[0]} fields changed, {result[1]} files written, {elapsed:.1f} ms')
+                elif result is not None:
+                    print(f'Balanced {file}: {result[0]} of {result[1]} creatures balanced, '
+                          f'{result[2]} fields changed, {"written" if result[3] else "output unchanged"}, '
+                          f'{elapsed:.1f} ms')
+
+            if changed:
+                save_manifest(prefix, formula, records)
+    except KeyboardInterrupt:
+        save_manifest(prefix, formula, records)
+        if cache_file is not None:
+            balancer.score_cache.save(cache_file, formula)
+
+        print('Stopped.')
@@ -0,0 +1,203 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+from an_balancer import (FIELDS, VERSION, Balancer, Document, find_creatures, load_tables, replace_value,
+                         replace_value_min_max)
+
+STAGES = ('parse', 'index', 'abilities', 'score', 'rewrite', 'total')
+
+
+# Text of a generated creature object, padding adds lines of fields that aren't balanced.
+# Skills are kept within ranges of LEVEL_RANGES, defence below 30 where calc_def_damage drops to zero
+def generate_creature(rng, balancer, name, abilities, padding):
+    ability_names = [ability[0] for ability in balancer.abilities]
+    level = rng.randint(1, 7)
+    attack_range, defence_range, max_damage_range, min_damage_lowest, hit_points_range = balancer.level_ranges[level]
+    max_damage = rng.randint(*max_damage_range)
+    lines = [
+        f'\t"{name}" :',
+        '\t{',
+        f'\t\t"index" : {rng.randint(0, 200)},',
+        f'\t\t"level" : {level},',
+        '\t\t"faction" : "castle",',
+        f'\t\t"upgrades" : ["{name}Upgraded"],',
+        f'\t\t"attack" : {rng.randint(*attack_range)},',
+        f'\t\t"defense" : {rng.randint(defence_range[0], min(defence_range[1], 25))}, // defence',
+        f'\t\t"hitPoints" : {rng.randint(*hit_points_range)},',
+        f'\t\t"speed" : {rng.randint(3, 16)},',
+        f'\t\t"damage" : {{ "min" : {rng.randint(min_damage_lowest, max_damage)}, "max" : {max_damage} }},',
+        f'\t\t"advMapAmount" : {{ "min" : {rng.randint(1, 20)}, "max" : {rng.randint(21, 50)} }},',
+        f'\t\t"aiValue" : {rng.randint(1, 5000)},',
+        f'\t\t"fightValue" : {rng.randint(1, 5000)},'
+    ]
+    for i in range(padding):
+        lines.append(f'\t\t"extra{i}" : {{ "name" : "padding {i}", "values" : [{i}, {i + 1}, {i + 2}] }},')
+
+    lines += ['\t\t"abilities" :', '\t\t{']
+    for i, ability_name in enumerate(rng.sample(ability_names, min(abilities, len(ability_names)))):
+        lines.append(f'\t\t\t"bonus{i}" : {{ "type" : "{ability_name}", "val" : {rng.randint(0, 40)} }},')
+
+    lines += ['\t\t},', '\t\t"graphics" : { "animation" : "CPKMAN.DEF" }', '\t}']
+    return lines
+
+
+def generate_file(rng, balancer, file_number, creatures, abilities, padding):
+    lines = ['{']
+    for i in range(creatures):
+        creature = generate_creature(rng, balancer, f'creature{file_number}_{i}', abilities, padding)
+        if i < creatures - 1:
+            creature[-1] += ','
+
+        lines += creature
+
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+# Runs stages of balancing over all texts, returns seconds spent in each stage.
+# New balancers are used for scoring and for the whole run, so both score like a fresh process would
+def run_stages(tables, texts):
+    timings = dict.fromkeys(STAGES, 0.0)
+    balancer = Balancer(tables)
+
+    start = time.perf_counter()
+    documents = [Document(text) for text in texts]
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    creatures = [find_creatures(document) for document in documents]
+    timings['index'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for indexes in creatures:
+        for index in indexes:
+            balancer.ability_mask(index.abilities)
+
+    timings['abilities'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records = []
+    scores = []
+    for indexes in creatures:
+        records.append([balancer.read_creature(index) for index in indexes])
+        scores.append([balancer.creature_values(creature) for creature in records[-1]])
+
+    timings['score'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for document, indexes, file_records, values in zip(documents, creatures, records, scores):
+        for index, creature, (fight_value, ai_value) in zip(indexes, file_records, values):
+            replace_value(document, index, FIELDS[11], round(ai_value))
+            replace_value(document, index, FIELDS[12], round(fight_value))
+            replace_value_min_max(document, index, FIELDS[7], creature.min_damage, creature.max_damage)
+            replace_value_min_max(document, index, FIELDS[10], 1, 50)
+
+        document.render()
+
+    timings['rewrite'] = time.perf_counter() - start
+
+    balancer = Balancer(tables)
+    start = time.perf_counter()
+    for text in texts:
+        balancer.balance_text(text)
+
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+
+# Benchmarks one case, reporting best and median time of each stage over repeats in milliseconds
+def run_case(files, creatures, abilities, padding, repeat, seed):
+    tables = load_tables()
+    balancer = Balancer(tables)
+    rng = random.Random(seed)
+    texts = [generate_file(rng, balancer, i, creatures, abilities, padding) for i in range(files)]
+    runs = [run_stages(tables, texts) for _ in range(repeat)]
+    stages = {}
+    for stage in STAGES:
+        times = sorted(run[stage] * 1000 for run in runs)
+        stages[stage] = {'best': round(times[0], 3), 'median': round(times[len(times) // 2], 3)}
+
+    return {
+        'name': f'creatures={creatures},abilities={abilities},padding={padding}',
+        'files': files,
+        'creatures': creatures,
+        'abilities': abilities,
+        'padding': padding,
+        'bytes': sum(len(text.encode()) for text in texts),
+        'stages': stages
+    }
+
+
+# Compares best times of stages with a previous result, returns lines describing stages slower than threshold
+def find_regressions(result, previous, threshold):
+    previous_cases = {case['name']: case for case in previous.get('cases', [])}
+    regressions = []
+    for case in result['cases']:
+        previous_case = previous_cases.get(case['name'])
+        if previous_case is None or previous_case['files'] != case['files']:
+            continue
+
+        for stage, timing in case['stages'].items():
+            old = previous_case['stages'].get(stage, {}).get('best')
+            if old and timing['best'] > old * (1 + threshold):
+                regressions.append(f'{case["name"]} {stage}: {old} ms -> {timing["best"]} ms')
+
+    return regressions
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark stages of An's Balancer on generated creature files")
+    parser.add_argument('-n', '--files', type=int, default=200, help='number of generated files of each case')
+    parser.add_argument('-c', '--creatures', type=parse_sizes, default=[1, 8], metavar='N[,N...]',
+                        help='creatures per file')
+    parser.add_argument('-a', '--abilities', type=parse_sizes, default=[0, 4, 16], metavar='N[,N...]',
+                        help='abilities per creature')
+    parser.add_argument('-p', '--padding', type=parse_sizes, default=[0, 50], metavar='N[,N...]',
+                        help='extra unbalanced fields per creature')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs of each case, best and median are reported')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of generated files')
+    parser.add_argument('-o', '--output', type=Path, help='write results to JSON file instead of stdout')
+    parser.add_argument('--compare', type=Path, metavar='FILE', help='previous results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown of a stage reported as regression, default 0.1')
+    args = parser.parse_args()
+
+    result = {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': []
+    }
+
+    for creatures in args.creatures:
+        for abilities in args.abilities:
+            for padding in args.padding:
+                case = run_case(args.files, creatures, abilities, padding, args.repeat, args.seed)
+                result['cases'].append(case)
+                print(f'{case["name"]}: ' + ', '.join(f'{stage} {timing["best"]} ms'
+                                                      for stage, timing in case['stages'].items()), file=sys.stderr)
+
+    if args.output:
+        with args.output.open('w') as f:
+            json.dump(result, f, indent=4)
+    else:
+        print(json.dumps(result, indent=4))
+
+    if args.compare:
+        with args.compare.open() as f:
+            regressions = find_regressions(result, json.load(f), args.threshold)
+
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+
+        if regressions:
+            sys.exit(1)
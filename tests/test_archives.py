@@ -0,0 +1,149 @@
+import io
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from an_balancer import Balancer
+from an_balancer.archives import DATA_DESCRIPTOR, create_balanced_archive
+
+# Directory run as the balancer, like python an-balancer
+PACKAGE = Path(__file__).resolve().parent.parent
+
+# Creature whose aiValue and fightValue are changed by balancing
+PIKEMAN = '''{
+\t"level": 1,
+\t"attack": 4,
+\t"defense": 5,
+\t"hitPoints": 10,
+\t"speed": 4,
+\t"damage":
+\t{
+\t\t"min": 1,
+\t\t"max": 3
+\t},
+\t"advMapAmount":
+\t{
+\t\t"min": 20,
+\t\t"max": 50
+\t},
+\t"upgrades": ["halberdier"],
+\t"aiValue": 80,
+\t"fightValue": 100
+}
+'''
+
+# Members of the test archive as (name, compression, text). Only the first one is changed by balancing
+MEMBERS = (
+    ('config/creatures/pikeman.json', zipfile.ZIP_STORED, PIKEMAN),
+    ('config/creatures/halberdier.json', zipfile.ZIP_DEFLATED, Balancer().balance_text(PIKEMAN)),
+    ('config/creatures/archer.json', zipfile.ZIP_STORED, Balancer().balance_text(PIKEMAN.replace('4', '3'))),
+    ('readme.txt', zipfile.ZIP_DEFLATED, 'Pikemen of the castle.\n' * 50),
+    ('sprites/CPKMAN.DEF', zipfile.ZIP_STORED, 'DEF' * 100)
+)
+
+
+# Extra field of extended timestamp given to each member, so data of copied members must be found past it
+EXTRA = struct.pack('<HHBl', 0x5455, 5, 1, 1577934246)
+
+
+# File object that can't seek, so zipfile writes sizes and CRC of each member in a data descriptor after its data
+class Unseekable(io.RawIOBase):
+    def __init__(self, f):
+        self.f = f
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def write_test_archive(path, data_descriptors=False):
+    with path.open('wb') as f:
+        with zipfile.ZipFile(Unseekable(f) if data_descriptors else f, 'w') as archive:
+            archive.comment = b'test mod'
+            for name, compression, text in MEMBERS:
+                info = zipfile.ZipInfo(name, (2020, 1, 2, 3, 4, 6))
+                info.extra = EXTRA
+                archive.writestr(info, text, compression)
+
+
+class TestBalancedArchive(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+
+    # Balances archive into a balanced copy, or in place, and checks the copy member by member
+    def check_archive(self, data_descriptors, repack):
+        archive_path = Path('mod.zip')
+        write_test_archive(archive_path, data_descriptors)
+        with zipfile.ZipFile(archive_path) as archive:
+            originals = {info.filename: info for info in archive.infolist()}
+
+        self.assertEqual(all(info.flag_bits & DATA_DESCRIPTOR for info in originals.values()), data_descriptors)
+        fields, written = create_balanced_archive('balanced' if repack else None, archive_path, Balancer(), repack)
+        self.assertEqual((fields, written), (2, 1))
+
+        output = Path('balanced', archive_path) if repack else archive_path
+        process = subprocess.run([sys.executable, '-m', 'zipfile', '-t', str(output)], stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, universal_newlines=True)
+        self.assertEqual(process.returncode, 0, process.stdout)
+        self.assertNotIn('corrupted', process.stdout)
+
+        with zipfile.ZipFile(output) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.comment, b'test mod')
+            self.assertEqual([info.filename for info in archive.infolist()], [name for name, _, _ in MEMBERS])
+            for name, compression, text in MEMBERS:
+                info = archive.getinfo(name)
+                original = originals[name]
+                self.assertEqual(info.compress_type, compression)
+                self.assertEqual(info.date_time, original.date_time)
+                if name == MEMBERS[0][0]:
+                    self.assertEqual(archive.read(name).decode(), Balancer().balance_text(text))
+                    continue
+
+                self.assertEqual(archive.read(name).decode(), text)
+                self.assertEqual(info.CRC, original.CRC)
+                self.assertEqual(info.compress_size, original.compress_size)
+                self.assertEqual(info.flag_bits, original.flag_bits & ~DATA_DESCRIPTOR)
+                self.assertEqual(info.extra, EXTRA)
+
+    def test_repack(self):
+        self.check_archive(False, True)
+
+    def test_repack_data_descriptors(self):
+        self.check_archive(True, True)
+
+    def test_inplace(self):
+        self.check_archive(False, False)
+
+    def test_inplace_data_descriptors(self):
+        self.check_archive(True, False)
+
+    # A balanced archive isn't written again
+    def test_unchanged(self):
+        archive_path = Path('mod.zip')
+        write_test_archive(archive_path)
+        self.assertEqual(create_balanced_archive('balanced', archive_path, Balancer(), True), (2, 1))
+        self.assertEqual(create_balanced_archive('balanced', archive_path, Balancer(), True), (2, 0))
+        self.assertEqual(create_balanced_archive(None, archive_path, Balancer()), (2, 1))
+        self.assertEqual(create_balanced_archive(None, archive_path, Balancer()), (0, 0))
+
+    # Zipped mods are balanced when their directory is walked, without --include
+    def test_directory(self):
+        Path('mods').mkdir()
+        write_test_archive(Path('mods', 'mod.zip'))
+        subprocess.run([sys.executable, str(PACKAGE), 'mods'], stdout=subprocess.DEVNULL, check=True)
+        self.assertEqual(Path('balanced', 'mods', 'mod.zip', MEMBERS[0][0]).read_text(),
+                         Balancer().balance_text(PIKEMAN))
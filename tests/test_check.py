@@ -0,0 +1,119 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from an_balancer import Balancer
+from an_balancer.check import check_document, check_files
+from an_balancer.document import Document
+
+# Directory run as the balancer, like python an-balancer
+PACKAGE = Path(__file__).resolve().parent.parent
+
+# Creature whose aiValue and fightValue are changed by balancing
+PIKEMAN = '''{
+\t"level": 1,
+\t"attack": 4,
+\t"defense": 5,
+\t"hitPoints": 10,
+\t"speed": 4,
+\t"damage":
+\t{
+\t\t"min": 1,
+\t\t"max": 3
+\t},
+\t"aiValue": 80,
+\t"fightValue": 100
+}
+'''
+
+BALANCED_PIKEMAN = Balancer().balance_text(PIKEMAN)
+
+# Fields of PIKEMAN that differ, as (line, field, current, expected)
+PIKEMAN_FIELDS = ((12, 'aiValue', '80', '115'), (13, 'fightValue', '100', '123'))
+
+
+# File holding given creatures as members of its top-level object, by name
+def creatures_file(**creatures):
+    members = (f'\t"{name}": ' + text.strip().replace('\n', '\n\t') for name, text in creatures.items())
+    return '{\n' + ',\n'.join(members) + '\n}\n'
+
+
+class TestCheckDocument(unittest.TestCase):
+    def test_divergences(self):
+        document = Document(PIKEMAN)
+        self.assertEqual(check_document(document, Balancer(), 'pikeman'),
+                         [(line, 'pikeman', field, current, expected)
+                          for line, field, current, expected in PIKEMAN_FIELDS])
+        self.assertEqual(document.text, PIKEMAN)
+
+    # Balancing replaces fields of a balanced creature by equal values, which aren't reported
+    def test_balanced(self):
+        self.assertEqual(check_document(Document(BALANCED_PIKEMAN), Balancer(), 'pikeman'), [])
+        text = creatures_file(halberdier=BALANCED_PIKEMAN, pikeman=PIKEMAN)
+        self.assertEqual([divergence[1:3] for divergence in check_document(Document(text), Balancer(), 'file')],
+                         [('pikeman', 'aiValue'), ('pikeman', 'fightValue')])
+
+    # Only fields of the first creature that differs are reported
+    def test_fail_fast(self):
+        text = creatures_file(pikeman=PIKEMAN, halberdier=PIKEMAN)
+        divergences = check_document(Document(text), Balancer(), 'file')
+        self.assertEqual([divergence[1] for divergence in divergences], ['pikeman'] * 2 + ['halberdier'] * 2)
+        self.assertEqual(check_document(Document(text), Balancer(), 'file', True), divergences[:2])
+
+    def test_no_creature(self):
+        with self.assertRaises(ValueError):
+            check_document(Document('{"name": "castle"}'), Balancer(), 'castle')
+
+
+class TestCheckFiles(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        Path('pikeman.json').write_text(PIKEMAN)
+        Path('balanced.json').write_text(BALANCED_PIKEMAN)
+        Path('multi.json').write_text(creatures_file(pikeman=PIKEMAN, halberdier=BALANCED_PIKEMAN))
+        with zipfile.ZipFile('mod.zip', 'w') as archive:
+            archive.writestr('config/creatures/balanced.json', BALANCED_PIKEMAN)
+            archive.writestr('config/creatures/pikeman.json', PIKEMAN)
+
+    # Runs --check on files, returns (exit code, CSV rows)
+    def run_check(self, *arguments):
+        process = subprocess.run([sys.executable, str(PACKAGE), '--check'] + list(arguments),
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        return process.returncode, process.stdout.splitlines()
+
+    def test_cli(self):
+        code, rows = self.run_check('pikeman.json', 'balanced.json', 'mod.zip')
+        self.assertEqual(code, 1)
+        self.assertEqual(rows, ['file,line,creature,field,current,expected'] +
+                         [f'{file},{line},pikeman,{field},{current},{expected}'
+                          for file in ('pikeman.json', 'mod.zip/config/creatures/pikeman.json')
+                          for line, field, current, expected in PIKEMAN_FIELDS])
+
+    def test_cli_balanced(self):
+        self.assertEqual(self.run_check('balanced.json'), (0, ['file,line,creature,field,current,expected']))
+
+    def test_cli_fail_fast(self):
+        code, rows = self.run_check('--fail-fast', 'balanced.json', 'multi.json', 'pikeman.json')
+        self.assertEqual(code, 1)
+        self.assertEqual([row.split(',')[:3] for row in rows[1:]],
+                         [['multi.json', '13', 'pikeman'], ['multi.json', '14', 'pikeman']])
+
+    def test_check_files(self):
+        output = io.StringIO()
+        files = [Path('mod.zip'), Path('balanced.json'), Path('multi.json'), Path('missing.json')]
+        errors, total, fields, divergent = check_files(files, 1, output)
+        self.assertEqual([file for file, _ in errors], [Path('missing.json')])
+        self.assertEqual((total, fields, divergent), (4, 4, [Path('mod.zip'), Path('multi.json')]))
+        self.assertEqual([row.split(',')[0] for row in output.getvalue().splitlines()[1:]],
+                         ['mod.zip/config/creatures/pikeman.json'] * 2 + ['multi.json'] * 2)
+
+        output = io.StringIO()
+        self.assertEqual(check_files(files, 1, output, True), ([], 1, 2, [Path('mod.zip')]))
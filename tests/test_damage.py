@@ -0,0 +1,70 @@
+import unittest
+
+from an_balancer import Balancer
+from an_balancer.balancer import calc_damage_coeff
+
+# Standard defence and attack of the 159 creatures as the first version of the balancer held them,
+# to check tables.json against
+ORIGINAL_STD_DEFENCE = (
+    5, 5, 3, 3, 8, 9, 12, 12, 7, 10, 15, 16, 20, 30, 3, 3, 7, 7, 5, 5, 8, 10, 12, 12, 14, 14, 18, 27,
+    3, 4, 6, 7, 10, 10, 8, 9, 12, 12, 13, 13, 16, 24, 3, 4, 4, 4, 6, 8, 10, 10, 13, 13, 12, 14, 21, 28,
+    4, 6, 5, 5, 7, 7, 9, 10, 10, 10, 16, 18, 15, 17, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 13, 14, 19, 25,
+    2, 3, 5, 5, 4, 4, 7, 7, 11, 11, 12, 13, 17, 19, 5, 6, 6, 8, 14, 16, 9, 10, 11, 12, 14, 14, 18, 20,
+    9, 10, 8, 10, 12, 12, 2, 2, 13, 13, 0, 10, 0, 11, 0, 9, 0, 8, 18, 18, 50, 40, 20, 30, 12, 10, 2,
+    1, 5, 7, 8, 3, 7, 10, 10, 0, 5, 5, 40, 36, 32, 37, 23, 33, 25, 27, 28
+)
+
+ORIGINAL_STD_ATTACK = (
+    4, 6, 6, 6, 8, 9, 10, 12, 12, 12, 15, 16, 20, 30, 5, 6, 6, 7, 9, 9, 9, 9, 9, 9, 15, 15, 18,
+    27, 3, 4, 6, 7, 7, 9, 11, 12, 12, 12, 16, 16, 19, 24, 2, 4, 6, 7, 10, 10, 10, 10, 13, 13,
+    16, 16, 19, 26, 5, 6, 5, 5, 7, 7, 10, 10, 13, 13, 16, 18, 17, 19, 4, 5, 6, 6, 9, 10, 9, 10,
+    14, 15, 15, 16, 19, 25, 4, 5, 7, 8, 8, 8, 13, 13, 13, 13, 15, 17, 17, 19, 3, 4, 5, 6, 10,
+    11, 7, 8, 11, 12, 14, 14, 16, 18, 9, 10, 10, 8, 11, 13, 2, 2, 15, 15, 0, 8, 0, 11, 0, 9, 0,
+    12, 18, 21, 50, 40, 20, 30, 17, 12, 4, 1, 6, 7, 9, 8, 14, 10, 10, 0, 0, 10, 40, 36, 32,
+    35, 25, 33, 25, 25, 28
+)
+
+# Skills and reductions checked: skills well beyond ranges of every level, as files may hold any skill,
+# against each "val" from 0 to 150 of abilities reducing attack or defence, divided by 100 as they are scored
+SKILLS = range(-20, 120)
+REDUCTIONS = [val / 100 for val in range(151)]
+
+
+# calc_att_damage as it was before memoization: a loop over all 159 standard creatures
+def original_att_damage(attack, enemy_defence_reduction):
+    result = 0
+    for i in ORIGINAL_STD_DEFENCE:
+        result += calc_damage_coeff(attack, i * (1 - enemy_defence_reduction))
+
+    result /= 159
+    return round(result)
+
+
+def original_def_damage(defence, general_attack_reduction):
+    result = 0
+    for i in ORIGINAL_STD_ATTACK:
+        result += calc_damage_coeff(i * (1 - general_attack_reduction), defence)
+
+    result /= 159
+    return round(result)
+
+
+class TestDamageTables(unittest.TestCase):
+    def test_standard_creatures(self):
+        balancer = Balancer()
+        self.assertEqual(balancer.std_defence, ORIGINAL_STD_DEFENCE)
+        self.assertEqual(balancer.std_attack, ORIGINAL_STD_ATTACK)
+
+    # Each result is checked when it's computed and again when it's read from the memoized table
+    def check_damage(self, calc_damage, original):
+        expected = {(skill, reduction): original(skill, reduction) for reduction in REDUCTIONS for skill in SKILLS}
+        for _ in range(2):
+            differences = [(key, calc_damage(*key), value) for key, value in expected.items()
+                           if calc_damage(*key) != value]
+            self.assertEqual(differences, [])
+
+    def test_att_damage(self):
+        self.check_damage(Balancer().calc_att_damage, original_att_damage)
+
+    def test_def_damage(self):
+        self.check_damage(Balancer().calc_def_damage, original_def_damage)
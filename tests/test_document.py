@@ -0,0 +1,108 @@
+import unittest
+
+from an_balancer.document import Document, parse
+
+
+# Plain values of node and its members, to compare parsed trees with what they should hold
+def plain(node):
+    if node.kind == 'object':
+        return {name: plain(member) for name, member in node.value.items()}
+    elif node.kind == 'array':
+        return [plain(item) for item in node.value]
+
+    return node.value
+
+
+class TestParse(unittest.TestCase):
+    def test_comments(self):
+        text = '''/* creature
+   of the castle */
+{
+\t// stats
+\t"attack": /* base */ 4, // of level 1
+\t"defense": 5 /* } */
+}
+'''
+        self.assertEqual(plain(parse(text)), {'attack': 4, 'defense': 5})
+
+    # Tokens inside comments aren't matched, even when no real token follows the comment
+    def test_comment_at_end(self):
+        for ending in ('// generated by hand\n', '// generated by hand', '/* generated\n by hand */\n'):
+            with self.subTest(ending=ending):
+                self.assertEqual(plain(parse('{\n\t"level": 1\n}\n' + ending)), {'level': 1})
+
+    def test_keys_on_one_line(self):
+        node = parse('{"damage": {"min": 1, "max": 3}, "speed": 4}')
+        self.assertEqual(plain(node), {'damage': {'min': 1, 'max': 3}, 'speed': 4})
+        damage = node.get('damage', 'object')
+        self.assertEqual(damage.get('max').start, 29)
+        self.assertEqual(damage.get('max').key, (22, 27))
+
+    def test_single_quotes(self):
+        text = "{'name': 'Pikeman', level: 1, 'sound': 'it\\'s \"loud\"'}"
+        self.assertEqual(plain(parse(text)), {'name': 'Pikeman', 'level': 1, 'sound': 'it\'s "loud"'})
+
+    def test_trailing_commas(self):
+        self.assertEqual(plain(parse('{"upgrades": ["halberdier",], "speed": 4,}')),
+                         {'upgrades': ['halberdier'], 'speed': 4})
+
+    def test_numbers(self):
+        text = '[0x1F, -0Xff, +5, .5, 5., 1e3, -2.5E-1, Infinity, NaN, true, false, null]'
+        values = plain(parse(text))
+        self.assertEqual(values[:7], [31, -255, 5, 0.5, 5.0, 1000.0, -0.25])
+        self.assertEqual(values[7], float('inf'))
+        self.assertNotEqual(values[8], values[8])
+        self.assertEqual(values[9:], [True, False, None])
+
+    def test_bom(self):
+        node = parse('﻿{"level": 1}')
+        self.assertEqual(plain(node), {'level': 1})
+        self.assertEqual(node.start, 1)
+
+    def test_repeated_key(self):
+        self.assertEqual(plain(parse('{"speed": 4, "speed": 5}')), {'speed': 4})
+
+    def test_errors(self):
+        cases = (
+            ('{"attack": 4 "defense": 5}', "line 1, column 14: expected ',' or end of object"),
+            ('[1, 2}', "line 1, column 6: expected ',' or end of array"),
+            ('{\n\t"attack" 4\n}', "line 2, column 11: expected ':'"),
+            ('{,}', 'line 1, column 2: expected key'),
+            ('[1, :]', 'line 1, column 5: expected value'),
+            ('{"level": 1}\n{"level": 2}', 'line 2, column 1: expected end of file'),
+            ('{"damage": {"min": 1', 'line 1, column 21: unexpected end of file'),
+            ('{"level":\n  @}', "line 2, column 3: unexpected character '@'"),
+            ('{"level": 1 /* }', "line 1, column 13: unexpected character '/'"),
+            ('{"level": 1 // }', 'line 1, column 17: unexpected end of file'),
+            ('{"level": 1 /* } */ @ /* } */', "line 1, column 21: unexpected character '@'"),
+            ('{"flying": tru}', "line 1, column 12: unexpected 'tru'"),
+            ('', 'line 1, column 1: unexpected end of file')
+        )
+        for text, message in cases:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError) as context:
+                    parse(text)
+
+                self.assertEqual(str(context.exception), message)
+
+
+class TestDocument(unittest.TestCase):
+    # Edits change only the values, comments and formatting around them are rendered as they are
+    def test_render(self):
+        text = "// pikeman\n{'attack': 4, /* base */ defense: 0x05,\n\t\"damage\": {min: 1, max: 3,},\n}\n"
+        document = Document(text)
+        damage = document.root.get('damage')
+        document.replace(document.root.get('defense'), 6)
+        document.replace(damage.get('max'), 4)
+        document.replace(damage.get('min'), 1)
+        self.assertEqual(sorted(document.edits), [document.root.get('defense').start, damage.get('max').start])
+        self.assertEqual(document.render(),
+                         "// pikeman\n{'attack': 4, /* base */ defense: 6,\n\t\"damage\": {min: 1, max: 4,},\n}\n")
+
+    def test_unchanged(self):
+        text = '{"attack": 4}'
+        document = Document(text)
+        document.replace(document.root.get('attack'), 5)
+        document.replace(document.root.get('attack'), 4)
+        self.assertEqual(document.edits, {})
+        self.assertEqual(document.render(), text)
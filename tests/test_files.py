@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from an_balancer.files import collect_files, walk_files
+
+# Files of the test tree, with balanced output of a previous run inside it
+TREE = (
+    'pikeman.json',
+    'notes.txt',
+    'mod.zip',
+    'config/creatures/imps.json',
+    'config/creatures/old/imps.json',
+    'config/heroes/orrin.json',
+    'balanced/.manifest.json',
+    'balanced/pikeman.json',
+    'balanced/config/creatures/imps.json'
+)
+
+
+class TestWalkFiles(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        for name in TREE:
+            Path(name).parent.mkdir(parents=True, exist_ok=True)
+            Path(name).write_text('{}')
+
+        self.output = Path('balanced').resolve()
+
+    def walk(self, include, exclude=(), output=None):
+        return sorted(path.as_posix() for path in walk_files(Path('.'), include, list(exclude), output))
+
+    def test_include(self):
+        self.assertEqual(self.walk(['*.json'], output=self.output),
+                         ['config/creatures/imps.json', 'config/creatures/old/imps.json', 'config/heroes/orrin.json',
+                          'pikeman.json'])
+        self.assertEqual(self.walk(['*.json', '*.zip'], output=self.output),
+                         ['config/creatures/imps.json', 'config/creatures/old/imps.json', 'config/heroes/orrin.json',
+                          'mod.zip', 'pikeman.json'])
+        self.assertEqual(self.walk(['config/creatures/*'], output=self.output),
+                         ['config/creatures/imps.json', 'config/creatures/old/imps.json'])
+
+    def test_exclude(self):
+        self.assertEqual(self.walk(['*.json'], ['old', 'orrin.json'], self.output),
+                         ['config/creatures/imps.json', 'pikeman.json'])
+        self.assertEqual(self.walk(['*.json'], ['config/*'], self.output), ['pikeman.json'])
+
+    # Without output directory, balanced files are walked like any other
+    def test_output(self):
+        self.assertIn('balanced/pikeman.json', self.walk(['*.json']))
+        self.assertIn('balanced/.manifest.json', self.walk(['*.json']))
+        self.assertTrue(all(not name.startswith('balanced/') for name in self.walk(['*'], output=self.output)))
+
+    # Given files are collected as they are, given directories are walked without entering output directory
+    def test_collect_files(self):
+        files = collect_files(['pikeman.json', 'config/heroes', 'balanced/pikeman.json'], ['*.json'], [], self.output)
+        self.assertEqual([path.as_posix() for path in files],
+                         ['pikeman.json', 'config/heroes/orrin.json', 'balanced/pikeman.json'])
+        files = collect_files([str(Path('config').resolve())], ['*.json'], [], Path('config', 'creatures').resolve())
+        self.assertEqual([path.name for path in files], ['orrin.json'])
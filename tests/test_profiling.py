@@ -0,0 +1,39 @@
+import unittest
+
+from an_balancer import check, cli, corpus, files, sweep, watch
+from an_balancer.profiling import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    # Modules importing functions by name call their own binding, which is wrapped and restored too
+    def test_patch_imported_functions(self):
+        originals = {module: (module.read_text, module.file_hash) for module in (files, watch)}
+        profiler = Profiler()
+        profiler.enable()
+        try:
+            for module in (check, corpus, sweep, watch):
+                self.assertIs(module.read_text, files.read_text)
+                self.assertIsNot(module.read_text, originals[files][0])
+
+            self.assertIs(watch.file_hash, files.file_hash)
+            self.assertIsNot(watch.file_hash, originals[files][1])
+            self.assertIs(cli.try_balance_text, files.try_balance_text)
+            self.assertIs(corpus.data_hash, files.data_hash)
+        finally:
+            profiler.disable()
+
+        for module, functions in originals.items():
+            self.assertEqual((module.read_text, module.file_hash), functions)
+
+        self.assertIs(check.read_text, originals[files][0])
+
+    def test_report(self):
+        profiler = Profiler()
+        profiler.enable()
+        try:
+            files.data_hash(b'{}')
+            watch.data_hash(b'{}')
+        finally:
+            profiler.disable()
+
+        self.assertEqual(profiler.files['-']['hash'][0], 2)
@@ -0,0 +1,80 @@
+import compileall
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from an_balancer import Balancer
+from benchmark import generate_file
+
+# Directory run as the balancer, like python an-balancer
+PACKAGE = Path(__file__).resolve().parent.parent
+
+# Largest median time in ms of imports beyond those of a bare interpreter, when balancing one file.
+# Can be raised on slow machines with environment variable AN_BALANCER_STARTUP_BUDGET
+BUDGET = float(os.environ.get('AN_BALANCER_STARTUP_BUDGET', 60))
+
+# Runs of each case, medians are checked
+REPEAT = 5
+
+# Modules a run balancing one file must not import, they are only needed by other options or by parallel jobs
+LAZY_MODULES = ('concurrent.futures', 'multiprocessing', 'cProfile', 'csv', 'ctypes', 'numpy', 'an_balancer.sweep',
+                'an_balancer.watch', 'an_balancer.profiling', 'an_balancer.corpus', 'sqlite3',
+                'an_balancer.archives', 'zipfile', 'an_balancer.solver',
+                'an_balancer.check')
+
+
+# Runs command with -X importtime, returns {module: self import time in ms}
+def run_importtime(command, directory, stdin=None):
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=directory, input=stdin,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    modules = {}
+    for line in process.stderr.decode().splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_time, _, name = line[len('import time:'):].split('|')
+        if self_time.strip().isdigit():
+            modules[name.strip()] = int(self_time) / 1000
+
+    return modules
+
+
+# Runs the balancer on one creature, from standard input and as a file, and checks how long its imports take
+# and that modules of other options aren't imported
+class TestStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Bytecode is compiled first, so imports aren't timed compiling when PYTHONDONTWRITEBYTECODE is set
+        compileall.compile_dir(str(PACKAGE / 'an_balancer'), quiet=1)
+        interpreter = run_importtime(['-c', 'pass'], PACKAGE)
+        text = generate_file(random.Random(0), Balancer(), 0, 1, 4, 0).encode()
+        cls.imports = {}
+        cls.lazy = {}
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'creature.json').write_bytes(text)
+            cases = (('stdin', [str(PACKAGE), '-'], text), ('file', [str(PACKAGE), '--force', 'creature.json'], None))
+            for name, command, stdin in cases:
+                imports = []
+                lazy = set()
+                for _ in range(REPEAT):
+                    modules = run_importtime(command, directory, stdin)
+                    imports.append(sum(elapsed for module, elapsed in modules.items() if module not in interpreter))
+                    lazy.update(module for module in modules
+                                if module.split('.')[0] in LAZY_MODULES or module in LAZY_MODULES)
+
+                cls.imports[name] = sorted(imports)[len(imports) // 2]
+                cls.lazy[name] = sorted(lazy)
+
+    def test_budget(self):
+        for name, imports in self.imports.items():
+            with self.subTest(case=name):
+                self.assertLessEqual(imports, BUDGET, f'imports take {imports:.1f} ms, budget is {BUDGET} ms')
+
+    def test_lazy_modules(self):
+        for name, lazy in self.lazy.items():
+            with self.subTest(case=name):
+                self.assertEqual(lazy, [], 'modules of other options imported eagerly')